@@ -9,7 +9,12 @@ from entities.barrier import Barrier
 from entities.cloud import Cloud
 
 from game_state.objects import boids, barriers, clouds, remove_element
+from game_state.scheduler import scheduler
+from game_state.simulation import SEPARATION_FACTOR, ALIGNMENT_FACTOR, COHESION_FACTOR
 
+from instrumentation import timings
+from rendering.barrier import cache as barrier_cache
+from rendering.cloud import cache as cloud_cache
 from UI.button import Button
 from UI.slider import Slider
 
@@ -19,6 +24,12 @@ last_keybind = None
 
 def reset_balloon():
     global current_balloon
+
+    if current_balloon is not None:
+        # Drop the sizes the balloon passed through while growing, its final size is cached on the next draw
+        barrier_cache.finish_growing()
+        cloud_cache.finish_growing()
+
     current_balloon = None
 
 
@@ -26,6 +37,10 @@ def is_holding_balloon():
     return current_balloon is not None
 
 
+def get_current_balloon() -> Balloon | None:
+    return current_balloon
+
+
 def get_current_action_from_keybind():
     return last_keybind
 
@@ -78,34 +93,34 @@ key_binds: dict[int | None, callable] = {
 
 action_buttons = [
     Button(main_screen_width - 60, main_screen_height - 60, 50, 50,
-           pygame.image.load("sprites/backspace.png"),
+           "backspace.png",
            key=pygame.K_BACKSPACE),
 
     Button(main_screen_width - 120, main_screen_height - 60, 50, 50,
-           pygame.image.load("sprites/arrow_white_center.png"),
+           "arrow_white_center.png",
            key=pygame.K_b),
     Button(main_screen_width - 180, main_screen_height - 60, 50, 50,
-           pygame.image.load("sprites/barrier.png"),
+           "barrier.png",
            key=pygame.K_p),
 
     Button(main_screen_width - 240, main_screen_height - 60, 50, 50,
-           pygame.image.load("sprites/cloud.png"),
+           "cloud.png",
            key=pygame.K_c),
 ]
 
 toggle_drawing_buttons = [
 
     Button(150, main_screen_height - 30, 20, 20,
-           pygame.image.load("sprites/arrow_white_center.png"), spring_up_on_update=False),
+           "arrow_white_center.png", spring_up_on_update=False),
 
     Button(180, main_screen_height - 30, 20, 20,
-           pygame.image.load("sprites/barrier.png"), spring_up_on_update=False),
+           "barrier.png", spring_up_on_update=False),
 
     Button(210, main_screen_height - 30, 20, 20,
-           pygame.image.load("sprites/cloud.png"), spring_up_on_update=False),
+           "cloud.png", spring_up_on_update=False),
 
     Button(240, main_screen_height - 30, 20, 20,
-           pygame.image.load("sprites/boid_vision.png"), spring_up_on_update=False),
+           "boid_vision.png", spring_up_on_update=False),
 ]
 
 toggle_drawing_buttons[0].is_pressed = True
@@ -113,10 +128,10 @@ toggle_drawing_buttons[1].is_pressed = True
 toggle_drawing_buttons[2].is_pressed = True
 
 pause_button = (Button(10, 10, 50, 50,
-                       pygame.image.load("sprites/unpaused.png"),
+                       "unpaused.png",
                        key=pygame.K_SPACE,
                        spring_up_on_update=False,
-                       pressed_image=pygame.image.load("sprites/paused.png"),
+                       pressed_image="paused.png",
                        )
                 )
 
@@ -125,24 +140,24 @@ sliders = [
 
            min_value=0.0,
            max_value=0.1,
-           value_percentage=5.0 / 10.0,
-           image=pygame.image.load("sprites/S.png"),
+           value_percentage=SEPARATION_FACTOR / 0.1,
+           image="S.png",
            ),
 
     Slider(30, main_screen_height - 80, 100, 30,
 
            min_value=0.0,
            max_value=5.0,
-           value_percentage=1.5 / 5.0,
-           image=pygame.image.load("sprites/A.png"),
+           value_percentage=ALIGNMENT_FACTOR / 5.0,
+           image="A.png",
            ),
 
     Slider(30, main_screen_height - 120, 100, 30,
 
            min_value=0.0,
            max_value=5.0,
-           value_percentage=1.5 / 5.0,
-           image=pygame.image.load("sprites/C.png"),
+           value_percentage=COHESION_FACTOR / 5.0,
+           image="C.png",
            ),
 ]
 
@@ -155,6 +170,15 @@ def handle_event(event):
         if event.key == pause_button.key:
             pause_button.is_pressed = not pause_button.is_pressed
 
+        if event.key == pygame.K_F3:
+            timings.toggle()
+
+        if event.key == pygame.K_F4:
+            scheduler.toggle_fast_forward()
+
+        if event.key == pygame.K_t:
+            boids.set_tracing(not boids.tracing)
+
         for b in action_buttons:
             b.update()
         set_keybind(event.key)
@@ -1,5 +1,6 @@
 import pygame
-from surfaces import main_screen
+import surfaces
+from rendering.assets import assets
 
 
 class Button:
@@ -12,7 +13,7 @@ class Button:
         self.y = y
         self.width = width
         self.height = height
-        self.base_image = pygame.transform.scale(image, (width, height))
+        self.base_image = assets.get_scaled(image, (width, height))
         self.rect = self.base_image.get_rect()
         self.rect.topleft = (x, y)
         self.outline_color = (200, 200, 200)
@@ -22,12 +23,21 @@ class Button:
         self.is_pressed = False
         self.pressed_image = None
         if pressed_image:
-            self.pressed_image = pygame.transform.scale(pressed_image, (width, height))
+            self.pressed_image = assets.get_scaled(pressed_image, (width, height))
         self.spring_up_on_update = spring_up_on_update
 
     def intersects(self, other_coordinates):
         return self.rect.collidepoint(other_coordinates)
 
+    @property
+    def area(self) -> pygame.Rect:
+        """Everything draw() and draw_outline() draw to."""
+        return self.rect
+
+    def get_draw_state(self) -> tuple:
+        """Changes whenever the button looks different."""
+        return self.is_pressed, bool(self.intersects(pygame.mouse.get_pos()))
+
     def update(self, click_coordinates: tuple | None = None):
         if self.spring_up_on_update:
             self.is_pressed = False
@@ -42,7 +52,7 @@ class Button:
         image = self.base_image
         if self.is_pressed and self.pressed_image is not None:
             image = self.pressed_image
-        main_screen.blit(image, (self.x, self.y))
+        surfaces.main_screen.blit(image, (self.x, self.y))
 
     def draw_outline(self):
         color = self.outline_color
@@ -50,4 +60,4 @@ class Button:
             color = self.outline_color_hover
         if (not self.spring_up_on_update) and self.is_pressed:
             color = self.outline_color_pressed
-        pygame.draw.rect(main_screen, color, self.rect, 2)
+        pygame.draw.rect(surfaces.main_screen, color, self.rect, 2)
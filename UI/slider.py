@@ -1,6 +1,7 @@
 import pygame
 
-from surfaces import main_screen
+import surfaces
+from rendering.assets import assets
 
 
 class Slider:
@@ -33,10 +34,9 @@ class Slider:
             button_height = height
 
         self.background_offset = height / 3
-        self.BASE_IMAGE = pygame.image.load("sprites/slider_bar.png")
-        self.BASE_IMAGE = pygame.transform.scale(self.BASE_IMAGE, (width, height - self.background_offset * 2))
+        self.BASE_IMAGE = assets.get_scaled("slider_bar.png", (width, height - self.background_offset * 2))
 
-        self.BUTTON_BASE_IMAGE = pygame.transform.scale(image, (button_width, button_height))
+        self.BUTTON_BASE_IMAGE = assets.get_scaled(image, (button_width, button_height))
         self.rect = self.BUTTON_BASE_IMAGE.get_rect()
         self.rect.topleft = (x + value_percentage * (width - button_width), y)
         self.hover_color = hover_color
@@ -51,6 +51,15 @@ class Slider:
     def intersects(self, other_coordinates):
         return self.rect.collidepoint(other_coordinates)
 
+    @property
+    def area(self) -> pygame.Rect:
+        """Everything draw() draws to, the bar and the handle."""
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def get_draw_state(self) -> tuple:
+        """Changes whenever the slider looks different."""
+        return self.rect.x,
+
     def release(self):
         self.dragging = False
 
@@ -72,9 +81,14 @@ class Slider:
     def get_value(self):
         return self.value
 
+    def set_value(self, value):
+        value_percentage = (value - self.min_value) / (self.max_value - self.min_value)
+        self.rect.x = self.x + value_percentage * (self.width - self.rect.width)
+        self.value = value
+
     def draw(self):
 
-        main_screen.blit(self.BASE_IMAGE, (self.x, self.y + self.background_offset))
-        main_screen.blit(self.BUTTON_BASE_IMAGE,
-                         (self.rect.x,
-                          self.rect.y))
+        surfaces.main_screen.blit(self.BASE_IMAGE, (self.x, self.y + self.background_offset))
+        surfaces.main_screen.blit(self.BUTTON_BASE_IMAGE,
+                                  (self.rect.x,
+                                   self.rect.y))
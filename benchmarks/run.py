@@ -0,0 +1,179 @@
+"""
+Times every phase of a simulation step over scripted scenarios with fixed seeds,
+writes the results to JSON and compares them with a stored baseline.
+
+    python -m benchmarks.run --output bench.json --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.scenarios import SCENARIOS
+from entities.boid import SIGHT_DISTANCE
+from game_state import chunks, objects, simulation
+from game_state.neighbors import NEIGHBOR_SEARCHES, GridSearch
+
+FPS = 30
+dt = 1 / FPS
+
+PHASES = ("neighbors", "flock", "move", "clouds", "render")
+
+
+def time_phase(timings: dict[str, list[float]], phase: str, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    timings[phase].append((time.perf_counter() - start) * 1000)
+
+
+def create_neighbor_search(name: str):
+    """A fresh search of that name. Grid based searches keep the chunk size set for the run, never re-measuring it."""
+    search_type = NEIGHBOR_SEARCHES[name]
+    if issubclass(search_type, GridSearch):
+        return search_type(autotune_steps=None)
+    return search_type()
+
+
+def run_scenario(name: str,
+                 steps: int,
+                 warmup: int,
+                 seed: int,
+                 render: bool,
+                 neighbors: str = GridSearch.name,
+                 chunk_size: float = SIGHT_DISTANCE) -> dict:
+    if render:
+        from rendering.scene import draw_world
+
+    # Nothing carries over from the scenarios run before, so results don't depend on which ran and in what order
+    chunks.set_chunk_size(chunk_size)
+    simulation.set_neighbor_search(create_neighbor_search(neighbors))
+    SCENARIOS[name].setup(seed)
+    timings = {phase: [] for phase in PHASES if render or phase != "render"}
+
+    for i in range(warmup + steps):
+        if i == warmup:
+            timings = {phase: [] for phase in timings}
+
+        time_phase(timings, "neighbors", simulation.update_neighbors)
+        time_phase(timings, "flock", simulation.flock_boids, dt)
+        time_phase(timings, "move", simulation.move_boids, dt)
+        time_phase(timings, "clouds", simulation.drift_clouds, dt)
+        simulation.run_time_seconds += dt
+
+        if render:
+            time_phase(timings, "render", draw_world, objects.boids, objects.barriers, objects.clouds)
+
+    return {
+        "counts": {"boids": len(objects.boids), "barriers": len(objects.barriers), "clouds": len(objects.clouds)},
+        "phases": {phase: {"median_ms": statistics.median(samples),
+                           "mean_ms": statistics.fmean(samples),
+                           "min_ms": min(samples)}
+                   for phase, samples in timings.items()},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float) -> list[str]:
+    """
+    Lists every phase whose median got slower than the baseline by more than threshold (0.1 = 10%),
+    and every startup step that did.
+    """
+    pairs = []
+    for name, result in results["scenarios"].items():
+        for phase, timing in result["phases"].items():
+            try:
+                pairs.append((f"{name}/{phase}", baseline["scenarios"][name]["phases"][phase]["median_ms"],
+                              timing["median_ms"]))
+            except KeyError:
+                continue
+
+    for step, after in results.get("startup", {}).items():
+        if step in baseline.get("startup", {}):
+            pairs.append((f"startup/{step}", baseline["startup"][step], after))
+
+    regressions = []
+    for name, before, after in pairs:
+        if after > min_ms and after > before * (1 + threshold):
+            regressions.append(f"{name}: {before:.3f} ms -> {after:.3f} ms "
+                               f"(+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the simulation phases over fixed scenarios.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="scenarios to run, all of them by default")
+    parser.add_argument("--steps", type=int, default=30, help="measured steps per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured steps before measuring")
+    parser.add_argument("--seed", type=int, default=0, help="seed every scenario starts from")
+    parser.add_argument("--neighbors", choices=NEIGHBOR_SEARCHES, default=GridSearch.name,
+                        help="neighbor search backend")
+    parser.add_argument("--chunk-size", type=float, default=SIGHT_DISTANCE,
+                        help="fixed chunk size in pixels of the grid based searches")
+    parser.add_argument("--render", action="store_true",
+                        help="also time drawing, opens a window (SDL_VIDEODRIVER=dummy to draw off screen)")
+    parser.add_argument("--output", default="bench_results.json", help="file the results are written to")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression, 0.1 is 10%%")
+    parser.add_argument("--min-ms", type=float, default=0.05,
+                        help="phases faster than this are too noisy to report as regressions")
+    args = parser.parse_args()
+
+    if args.render:
+        import pygame
+        import surfaces
+        pygame.init()
+        surfaces.init_display()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "seed": args.seed,
+            "steps": args.steps,
+            "warmup": args.warmup,
+            "neighbors": args.neighbors,
+            "chunk_size": args.chunk_size,
+        },
+        "scenarios": {},
+    }
+
+    for name in args.scenarios:
+        result = run_scenario(name, args.steps, args.warmup, args.seed, args.render, args.neighbors, args.chunk_size)
+        results["scenarios"][name] = result
+        phases = ", ".join(f"{phase} {timing['median_ms']:.2f}" for phase, timing in result["phases"].items())
+        print(f"{name}: {phases} (median ms)")
+
+    if args.render:
+        # Sprites are loaded by the first import of the rendering modules
+        from rendering.assets import assets
+        results["startup"] = {"asset_load_ms": assets.load_seconds * 1000}
+        print(f"sprites loaded in {assets.load_seconds * 1000:.2f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline is None:
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold, args.min_ms)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
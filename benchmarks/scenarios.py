@@ -0,0 +1,62 @@
+import math
+import random
+
+from calculations.vector import Vector
+from entities.barrier import Barrier
+from entities.boid import Boid, MAX_SPEED
+from entities.cloud import Cloud
+from game_state import objects, simulation
+from surfaces import main_screen_width, main_screen_height
+
+
+class Scenario:
+    """A reproducible starting world: how many boids, barriers and clouds, and how tightly the boids start."""
+
+    def __init__(self, name: str, boids: int, barriers: int = 0, clouds: int = 0, spread: float | None = None):
+        self.name = name
+        self.boids = boids
+        self.barriers = barriers
+        self.clouds = clouds
+        # Radius of the disc the boids start in, None to spread them over the whole screen
+        self.spread = spread
+
+    def setup(self, seed: int):
+        random.seed(seed)
+        objects.clear()
+        simulation.reset()
+
+        if self.spread is None:
+            objects.add_boids(self.boids)
+        else:
+            for _ in range(self.boids):
+                angle = random.uniform(0, 2 * math.pi)
+                distance = self.spread * math.sqrt(random.random())
+                v = Vector(1, 1)
+                v.set_radians(random.uniform(0, 2 * math.pi))
+                v.set_magnitude(MAX_SPEED)
+                objects.boids.append(Boid(x=main_screen_width / 2 + math.cos(angle) * distance,
+                                          y=main_screen_height / 2 + math.sin(angle) * distance,
+                                          direction=v))
+
+        for _ in range(self.barriers):
+            barrier = Barrier(x=random.uniform(0, main_screen_width),
+                              y=random.uniform(0, main_screen_height),
+                              pop=False)
+            barrier.radius = random.uniform(barrier.MIN_RADIUS, barrier.MAX_RADIUS)
+            objects.barriers.append(barrier)
+
+        for _ in range(self.clouds):
+            cloud = Cloud(x=random.uniform(0, main_screen_width), y=random.uniform(0, main_screen_height))
+            cloud.radius = random.uniform(cloud.MIN_RADIUS, cloud.MAX_RADIUS)
+            objects.clouds.append(cloud)
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (
+    Scenario("default", objects.BOID_COUNT),
+    Scenario("boids_1k", 1_000),
+    Scenario("boids_10k", 10_000),
+    Scenario("boids_100k", 100_000),
+    Scenario("dense_flock", 2_000, spread=100),
+    Scenario("many_barriers", 1_000, barriers=200),
+    Scenario("many_clouds", 1_000, clouds=300),
+)}
@@ -1,9 +1,13 @@
 import math
 from typing import Self
 
+import numpy as np
+
 
 class Vector:
 
+    __slots__ = ("dx", "dy")
+
     def __init__(self, dx=0.0, dy=0.0):
         self.dx = dx
         self.dy = dy
@@ -25,6 +29,15 @@ class Vector:
             raise ValueError("Can't add Vector with non Vector")
         return Vector((other[0] + self.dx), (other[1] + self.dy))
 
+    def __iadd__(self, other) -> Self:
+        try:
+            other = (other.dx, other.dy)
+        except AttributeError:
+            raise ValueError("Can't add Vector with non Vector")
+        self.dx += other[0]
+        self.dy += other[1]
+        return self
+
     def __sub__(self, other) -> Self:
         try:
             other = (other.dx, other.dy)
@@ -36,6 +49,11 @@ class Vector:
 
         return Vector((self.dx * other), (self.dy * other))
 
+    def __imul__(self, other: float) -> Self:
+        self.dx *= other
+        self.dy *= other
+        return self
+
     def __truediv__(self, other: float) -> Self:
 
         return Vector((self.dx / other), (self.dy / other))
@@ -46,47 +64,54 @@ class Vector:
 
     def set_radians(self, radians):
         magnitude = self.get_magnitude()
-        self.dx = math.cos(radians)
-        self.dy = math.sin(radians)
-
-        self.set_magnitude(magnitude)
+        self.dx = math.cos(radians) * magnitude
+        self.dy = math.sin(radians) * magnitude
 
     def get_radians(self):
         return math.atan2(self.dy, self.dx) % (2 * math.pi)
 
     def set_magnitude(self, magnitude):
-        radians = self.get_radians()
-        self.dx = math.cos(radians) * magnitude
-        self.dy = math.sin(radians) * magnitude
+        # A zero vector has no direction, it is pointed along +x like atan2(0, 0) would
+        current = math.sqrt(self.dx * self.dx + self.dy * self.dy)
+        if current == 0:
+            self.dx = magnitude
+            self.dy = 0.0
+            return
+
+        scale = magnitude / current
+        self.dx *= scale
+        self.dy *= scale
 
     def get_magnitude(self):
-        return math.sqrt(self.dx ** 2 + self.dy ** 2)
+        return math.sqrt(self.dx * self.dx + self.dy * self.dy)
 
     def clamp_magnitude(self, cap, min_=0):
+        magnitude = math.sqrt(self.dx * self.dx + self.dy * self.dy)
 
-        if self.get_magnitude() > cap:
-            self.set_magnitude(cap)
-        if self.get_magnitude() < -cap:
-            self.set_magnitude(-cap)
+        target = cap if magnitude > cap else magnitude
+        if 0 < target < min_:
+            target = min_
 
-        if 0 < self.get_magnitude() < min_:
-            self.set_magnitude(min_)
-        if -min_ < self.get_magnitude() < 0:
-            self.set_magnitude(-min_)
+        if target != magnitude:
+            scale = target / magnitude
+            self.dx *= scale
+            self.dy *= scale
 
     def get_opposite(self):
         return Vector(dx=-self.dx, dy=-self.dy)
 
     def rotate(self, angle):
-        radians = (self.get_radians() + angle) % (2 * math.pi)
-        self.set_radians(radians)
+        cos = math.cos(angle)
+        sin = math.sin(angle)
+        self.dx, self.dy = self.dx * cos - self.dy * sin, self.dx * sin + self.dy * cos
 
     @staticmethod
     def get_sum(vectors):
-        vector_sum = Vector(0, 0)
+        dx = dy = 0
         for vector in vectors:
-            vector_sum += vector
-        return vector_sum
+            dx += vector.dx
+            dy += vector.dy
+        return Vector(dx, dy)
 
     @staticmethod
     def get_average(vectors):
@@ -98,4 +123,56 @@ class Vector:
         return Vector(x, y)
 
     def get_unit_vector(self):
-        return Vector(self.dx / self.get_magnitude(), self.dy / self.get_magnitude())
+        magnitude = self.get_magnitude()
+        return Vector(self.dx / magnitude, self.dy / magnitude)
+
+
+class VectorArray:
+    """
+    Many vectors as the rows of one (n, 2) array, so sums, averages and magnitude changes
+    run as a few array operations instead of a Vector per element.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data=()):
+        # An (n, 2) float array is used as is, so the in-place methods write through to it
+        data = np.asarray(data, dtype=np.float64)
+        self.data = data if data.ndim == 2 else data.reshape(-1, 2)
+
+    @classmethod
+    def from_vectors(cls, vectors) -> Self:
+        return cls([(vector.dx, vector.dy) for vector in vectors])
+
+    def __len__(self):
+        return len(self.data)
+
+    def get_sum(self) -> Vector:
+        dx, dy = self.data.sum(axis=0).tolist()
+        return Vector(dx, dy)
+
+    def get_average(self) -> Vector:
+        # Averages to the origin when empty, like Vector.get_average
+        if not len(self.data):
+            return Vector(0, 0)
+        dx, dy = self.data.mean(axis=0).tolist()
+        return Vector(dx, dy)
+
+    def get_magnitudes(self) -> np.ndarray:
+        return np.hypot(self.data[:, 0], self.data[:, 1])
+
+    def set_magnitudes(self, magnitudes):
+        # Vector.set_magnitude for every row, zero rows are pointed along +x
+        norm = self.get_magnitudes()
+        moving = norm > 0
+        scale = np.divide(magnitudes, norm, out=np.zeros_like(norm), where=moving)
+        self.data *= scale[:, None]
+        self.data[~moving, 0] = np.broadcast_to(magnitudes, norm.shape)[~moving]
+
+    def clamp_magnitudes(self, cap: float, min_: float = 0.0):
+        # Vector.clamp_magnitude for every row
+        norm = self.get_magnitudes()
+        target = np.where(norm > cap, cap, norm)
+        target = np.where((0 < target) & (target < min_), min_, target)
+        scale = np.divide(target, norm, out=np.ones_like(norm), where=norm > 0)
+        self.data *= scale[:, None]
@@ -1,16 +1,11 @@
 import math
 
-import pygame
-
 from entities.balloon import Balloon
-from surfaces import main_screen
-from vector import Vector
+from calculations.vector import Vector
 
 
 class Barrier(Balloon):
 
-    IMAGE = pygame.image.load("sprites/barrier.png")
-
     def __init__(self,
                  x: float,
                  y: float,
@@ -26,8 +21,8 @@ class Barrier(Balloon):
         return f"X: {self.x}, Y: {self.y}, Radius: {self.radius}, Pop: {self.pop}"
 
     def draw(self):
-        image = pygame.transform.scale(self.IMAGE, (self.radius * 2, self.radius * 2))
-        main_screen.blit(image, (self.x - self.radius, self.y - self.radius))
+        from rendering.barrier import draw_barrier
+        draw_barrier(self)
 
     def get_boid_repulsion_force(self, coordinates: tuple, sight_distance: float) -> Vector | None:
         x, y = coordinates
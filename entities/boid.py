@@ -1,11 +1,9 @@
-import pygame
+import numpy as np
 
-from surfaces import main_screen, main_screen_width, main_screen_height
+from surfaces import main_screen_width, main_screen_height
 
 import math
-from calculations import angles
-from calculations.coloring import interpolate_color, replace_color
-from calculations.vector import Vector
+from calculations.vector import Vector, VectorArray
 from typing import Self
 from entities.entity import Entity
 
@@ -20,15 +18,11 @@ MAX_FORCE = 40
 TRACER_DURATION = 0.4
 TRACES_PER_SECOND = 100
 SECONDS_PER_TRACE = 1 / TRACES_PER_SECOND
+TRACE_LENGTH = round(TRACES_PER_SECOND * TRACER_DURATION)  # points kept per boid
 
 MAX_VARIATION = math.radians(40)
 VARIATION_PERCENTAGE_PER_SECOND = 0.5
 
-IMAGE = pygame.transform.flip(
-    pygame.transform.scale(pygame.image.load("sprites/arrow_white_center.png"),
-                           (SIZE, SIZE)),
-    True,
-    False)
 GRADIENT_COLORING = True
 
 REPLACE_COLOR = (255, 255, 255)
@@ -51,41 +45,175 @@ WALL_FACTOR = 20.0
 
 
 class Tracer:
-    def __init__(self, x, y, color_main=TRACER_COLOR, max_traces=TRACES_PER_SECOND * TRACER_DURATION):
-        self.max_traces = max_traces
+    """The recent positions of a boid, kept in its row of the trace ring buffers of its storage."""
 
-        self.points = [(x, y)]
+    def __init__(self, boid, color_main=TRACER_COLOR):
+        self.boid = boid
         self.color_main = color_main
 
-    def add_line(self, x, y):
-        self.points.append((x, y))
+    @property
+    def max_traces(self):
+        return TRACE_LENGTH
+
+    @property
+    def points(self) -> list[tuple[float, float]]:
+        """Oldest first."""
+        storage, index = self.boid.storage, self.boid.index
+        length = storage.trace_lengths[index]
+        order = (storage.trace_heads[index] - length + np.arange(length)) % TRACE_LENGTH
+        return [tuple(point) for point in storage.traces[index, order].tolist()]
 
-        if len(self.points) > self.max_traces:
-            self.points.pop(0)
+    def add_line(self, x, y):
+        storage, index = self.boid.storage, self.boid.index
+        storage.traces[index, storage.trace_heads[index]] = (x, y)
+        storage.trace_heads[index] = (storage.trace_heads[index] + 1) % TRACE_LENGTH
+        storage.trace_lengths[index] = min(storage.trace_lengths[index] + 1, TRACE_LENGTH)
 
     def draw(self):
-        for i, (p1, p2) in enumerate(zip(self.points, self.points[1:])):
-            pygame.draw.line(main_screen, color=self.color_main, start_pos=p1, end_pos=p2, width=min(i // 2, 4))
+        from rendering.boid import draw_tracer
+        draw_tracer(self)
+
+
+class BoidStorage:
+    """Contiguous per-boid state. A detached Boid owns a single-row storage, a Flock owns one row per member."""
+
+    FIELDS = ("positions", "directions", "neighbors_count", "chunk_cells", "traces", "trace_heads", "trace_lengths",
+              "steering", "update_intervals")
+
+    # chunk_cells value of a boid that is not in the chunk index yet
+    NO_CHUNK = np.iinfo(np.int64).min
+
+    def __init__(self, capacity: int = 1):
+        self.positions = np.zeros((capacity, 2))
+        self.directions = np.zeros((capacity, 2))
+        self.neighbors_count = np.zeros(capacity, dtype=np.int64)
+        self.chunk_cells = np.full((capacity, 2), self.NO_CHUNK, dtype=np.int64)
+
+        # One ring of TRACE_LENGTH points per boid: the next slot to write, and how many slots hold a point
+        self.traces = np.zeros((capacity, TRACE_LENGTH, 2))
+        self.trace_heads = np.zeros(capacity, dtype=np.int64)
+        self.trace_lengths = np.zeros(capacity, dtype=np.int64)
+        # Traces are only recorded while they are shown
+        self.tracing = False
+
+        # Change of direction per second of the last steering, and every how many steps the boid steers,
+        # see level_of_detail.StaggeredSteering
+        self.steering = np.zeros((capacity, 2))
+        self.update_intervals = np.ones(capacity, dtype=np.int64)
+
+    def copy_rows(self, source: "BoidStorage", source_rows, rows):
+        for field in self.FIELDS:
+            getattr(self, field)[rows] = getattr(source, field)[source_rows]
+
+    def record_traces(self, rows: np.ndarray):
+        """Adds the current position of every row to its ring, dropping its oldest point when full."""
+        heads = self.trace_heads[rows]
+        self.traces[rows, heads] = self.positions[rows]
+        self.trace_heads[rows] = (heads + 1) % TRACE_LENGTH
+        self.trace_lengths[rows] = np.minimum(self.trace_lengths[rows] + 1, TRACE_LENGTH)
+
+
+class DirectionView(Vector):
+    """Vector whose components read and write a boid's row in its storage."""
+
+    __slots__ = ("_boid",)
+
+    def __init__(self, boid):
+        self._boid = boid
+
+    @property
+    def dx(self):
+        return self._boid.storage.directions[self._boid.index, 0]
+
+    @dx.setter
+    def dx(self, value):
+        self._boid.storage.directions[self._boid.index, 0] = value
+
+    @property
+    def dy(self):
+        return self._boid.storage.directions[self._boid.index, 1]
+
+    @dy.setter
+    def dy(self, value):
+        self._boid.storage.directions[self._boid.index, 1] = value
 
 
 class Boid(Entity):
     def __init__(self, x=main_screen_width / 2, y=main_screen_height / 2, direction=Vector()):
 
+        self.storage = BoidStorage()
+        self.index = 0
+        self._direction = DirectionView(self)
+
         super().__init__(x, y)
-        self.image = IMAGE
 
-        self.neighbors_count = 0
         self.color = (0, 0, 0)
         self.coloring_pending_seconds = 0.0
 
-        self.direction: Vector = direction
+        self.direction = direction
 
-        self.tracer = Tracer(self.x, self.y)
+        self.tracer = Tracer(self)
         self.tracer_pending_seconds = 0.0
 
     def __repr__(self):
         return f"X: {self.x}, Y: {self.y}, "
 
+    @classmethod
+    def view_of(cls, storage: BoidStorage, index: int) -> Self:
+        """A Boid over a row of storage that is already filled in, without a storage of its own."""
+        boid = cls.__new__(cls)
+        boid.storage = storage
+        boid.index = index
+        boid._direction = DirectionView(boid)
+        boid.current_chunk = None
+        boid.chunk_index = None
+
+        boid.color = (0, 0, 0)
+        boid.coloring_pending_seconds = 0.0
+        boid.tracer = Tracer(boid)
+        boid.tracer_pending_seconds = 0.0
+        return boid
+
+    @property
+    def x(self):
+        return self.storage.positions[self.index, 0]
+
+    @x.setter
+    def x(self, value):
+        self.storage.positions[self.index, 0] = value
+
+    @property
+    def y(self):
+        return self.storage.positions[self.index, 1]
+
+    @y.setter
+    def y(self, value):
+        self.storage.positions[self.index, 1] = value
+
+    @property
+    def direction(self) -> Vector:
+        return self._direction
+
+    @direction.setter
+    def direction(self, value: Vector):
+        self.storage.directions[self.index] = (value.dx, value.dy)
+
+    @property
+    def neighbors_count(self):
+        return self.storage.neighbors_count[self.index]
+
+    @neighbors_count.setter
+    def neighbors_count(self, value):
+        self.storage.neighbors_count[self.index] = value
+
+    def attach(self, storage: BoidStorage, index: int):
+        storage.copy_rows(self.storage, self.index, index)
+        self.storage = storage
+        self.index = index
+
+    def detach(self):
+        self.attach(BoidStorage(), 0)
+
     def __eq__(self, other: Self) -> bool:
         return (self.x == other.x and
                 self.y == other.y and
@@ -213,18 +341,18 @@ class Boid(Entity):
         force = Vector()
 
         # Alignment
-        avg = Vector.get_average(alignment_forces)
+        avg = VectorArray.from_vectors(alignment_forces).get_average()
         alignment_force = avg - self.direction
         force += alignment_force * alignment_factor
 
         # Cohesion
-        avg = Vector.get_average([Vector(p[0], p[1]) for p in cohesion_points])
+        avg = VectorArray(cohesion_points).get_average()
         to_average_position = Vector(avg.dx - self.x, self.y - avg.dy)
         cohesion_force = to_average_position - self.direction
         force += cohesion_force * cohesion_factor
 
         # Separation
-        separation_force = Vector.get_sum(separation_forces)
+        separation_force = VectorArray.from_vectors(separation_forces).get_sum()
         force += separation_force * separation_factor
         force += self.get_wall_avoidance_force() * WALL_FACTOR
 
@@ -234,53 +362,23 @@ class Boid(Entity):
         self.direction += force
         self.direction.clamp_magnitude(MAX_SPEED, min_=MIN_SPEED)
 
-        self.tracer_pending_seconds += dt
-        if self.tracer_pending_seconds > SECONDS_PER_TRACE:
-            self.tracer_pending_seconds = 0.0
-            self.tracer.points.append((self.x, self.y))
-
-        if len(self.tracer.points) > TRACER_DURATION * TRACES_PER_SECOND:
-            self.tracer.points.pop(0)
+        if self.storage.tracing:
+            self.tracer_pending_seconds += dt
+            if self.tracer_pending_seconds > SECONDS_PER_TRACE:
+                self.tracer_pending_seconds = 0.0
+                self.tracer.add_line(self.x, self.y)
 
     def draw(self):
-        rad = self.get_radians()
-        quadrant = angles.get_quadrant(rad)
-
-        image = IMAGE
-
-        if GRADIENT_COLORING:
-            neighbor_percentage = min((self.neighbors_count / TARGET_NEIGHBOUR_COUNT), 1)
-            self.color = interpolate_color(ALONE_COLOR, TOGETHER_COLOR, neighbor_percentage)
-            image = replace_color(image, old_color=(255, 255, 255), new_color=(205, 205, 180))
-
-        if quadrant in (1, 4):
-            image = pygame.transform.rotate(image, math.degrees(rad))
-        else:
-            image = pygame.transform.flip(
-                pygame.transform.rotate(image, 180 - math.degrees(rad)), True, False)
-
-        w = image.get_width()
-        h = image.get_height()
-        left = self.x - w / 2
-        top = self.y - h / 2
-
-        main_screen.blit(image, (left, top))
+        from rendering.boid import draw_boid
+        draw_boid(self)
 
     def draw_sight(self):
-
-        color = SIGHT_COLOR
-
-        if GRADIENT_COLORING:
-            neighbor_percentage = min((self.neighbors_count / TARGET_NEIGHBOUR_COUNT), 1)
-            color = interpolate_color(ALONE_COLOR, TOGETHER_COLOR, neighbor_percentage)
-
-        surface = pygame.Surface((SIGHT_DISTANCE * 2, SIGHT_DISTANCE * 2), pygame.SRCALPHA)
-        (pygame.draw.circle
-         (surface, color=(*color, SIGHT_ALPHA), center=(SIGHT_DISTANCE, SIGHT_DISTANCE), radius=SIGHT_DISTANCE))
-        main_screen.blit(surface, (self.x - SIGHT_DISTANCE, self.y - SIGHT_DISTANCE))
+        from rendering.boid import draw_sight
+        draw_sight(self)
 
     def draw_personal_space(self):
-        pygame.draw.circle(main_screen, PERSONAL_SPACE_COLOR, self.get_coordinates(), PERSONAL_SPACE)
+        from rendering.boid import draw_personal_space
+        draw_personal_space(self)
 
     def draw_trace(self):
         self.tracer.draw()
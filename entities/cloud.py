@@ -1,20 +1,16 @@
 import math
 
-import pygame
-
 import random
 
-from calculations.vector import Vector
+from calculations.vector import Vector, VectorArray
 
 from entities.balloon import Balloon
-from entity import Entity
-from surfaces import main_screen, main_screen_width, main_screen_height
+from entities.entity import Entity
+from surfaces import main_screen_width, main_screen_height
 
 
 class Cloud(Balloon):
 
-    IMAGE = pygame.image.load("sprites/cloud.png")
-
     MAX_SPEED = 30
     HORIZONTAL_DRIFT_SPEED = 15
 
@@ -25,14 +21,18 @@ class Cloud(Balloon):
 
     OVERLAP_BLOCK_PERCENT = 0.8
 
+    # drift() considers the clouds in the 3 x 3 block of cells this wide around the cloud's own,
+    # or within this distance with simulation.set_wrapped_clouds(), and the boids within it
+    SIGHT_DISTANCE = 110
+
     def __init__(self,
                  x: float,
                  y: float,
                  direction: Vector = Vector(0, 0),
                  radius: float = 0.0):
 
-        self.image = pygame.transform.scale(self.IMAGE, (0, 0))
-        self.direction = direction
+        # Copied, direction is changed in place and the default is shared
+        self.direction = Vector(direction.dx, direction.dy)
         super().__init__(x, y, radius)
         c = random.randint(235, 255)
         self.color = (c, c, c)
@@ -66,19 +66,27 @@ class Cloud(Balloon):
         self.y %= main_screen_height
 
     def drift(self,
-              chunk: list[Entity],
+              clouds: list[tuple["Cloud", tuple[float, float]]],
+              boids: list[Entity],
               dt,):
+        """
+        Args:
+            clouds: Nearby clouds with the offset to their copy next to this one, see chunks.BlockGrid.query.
+            boids: Nearby boids.
+        """
 
         merge_points = []
         alignment_forces = []
 
-        for elem in chunk:
-            if elem != self:
-                if (p := elem.get_cloud_merge_point(self.get_coordinates(), self.radius)) is not None:
-                    merge_points.append(p)
+        for cloud, (offset_x, offset_y) in clouds:
+            if cloud is not self:
+                # Merged towards the copy of the cloud across the screen edge when that is the near one
+                x, y = cloud.get_cloud_merge_point((self.x - offset_x, self.y - offset_y), self.radius)
+                merge_points.append((x + offset_x, y + offset_y))
 
-                if (p := elem.get_cloud_repulsion_force(self.get_coordinates(), self.radius)) is not None:
-                    alignment_forces.append(p)
+        for boid in boids:
+            if (p := boid.get_cloud_repulsion_force(self.get_coordinates(), self.radius)) is not None:
+                alignment_forces.append(p)
 
         force = Vector()
 
@@ -90,14 +98,14 @@ class Cloud(Balloon):
                 closest_val = dist
                 closest_points = [p]
 
-        avg = Vector.get_average([Vector(p[0], p[1]) for p in closest_points])
+        avg = VectorArray(closest_points).get_average()
         #pygame.draw.circle(main_screen, (200, 200, 200), (avg.dx, avg.dy), 2)
         to_average_position = Vector(avg.dx - self.x, avg.dy - self.y)
         #to_average_position -= to_average_position.get_unit_vector() * self.BORDER_THICKNESS
         merge_force = to_average_position - self.direction
         force += merge_force
 
-        avg = Vector.get_average(alignment_forces)
+        avg = VectorArray.from_vectors(alignment_forces).get_average()
         alignment_force = avg - self.direction
         force += alignment_force * 2
 
@@ -106,25 +114,5 @@ class Cloud(Balloon):
         self.direction.clamp_magnitude(self.MAX_SPEED)
 
     def draw(self):
-
-        if self.radius == 0:
-            return
-
-        circle_surface = pygame.Surface((2 * self.radius, 2 * self.radius), pygame.SRCALPHA)
-
-        pygame.draw.circle(circle_surface, self.color, (self.radius, self.radius), self.radius)
-        pygame.draw.circle(circle_surface, tuple((v-20) for v in self.color), (self.radius, self.radius),
-                           self.radius, self.BORDER_THICKNESS)
-        main_screen.blit(circle_surface, (self.x - self.radius, self.y - self.radius))
-
-        if self.x + self.radius >= main_screen_width:
-            main_screen.blit(circle_surface, (self.x - self.radius - main_screen_width, self.y - self.radius))
-
-        if self.x - self.radius <= 0:
-            main_screen.blit(circle_surface, (self.x - self.radius + main_screen_width, self.y - self.radius))
-
-        if self.y + self.radius >= main_screen_height:
-            main_screen.blit(circle_surface, (self.x - self.radius, self.y - self.radius - main_screen_height))
-
-        if self.y - self.radius <= 0:
-            main_screen.blit(circle_surface, (self.x - self.radius, self.y - self.radius + main_screen_height))
+        from rendering.cloud import draw_cloud
+        draw_cloud(self)
@@ -1,4 +1,4 @@
-from vector import Vector
+from calculations.vector import Vector
 
 
 class Entity:
@@ -10,6 +10,7 @@ class Entity:
         self.x = x
 
         self.current_chunk = None
+        self.chunk_index = None
 
     def intersects(self, other_coordinates):
         raise NotImplemented("Intersects method not implemented")
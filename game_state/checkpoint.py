@@ -0,0 +1,162 @@
+import math
+import os
+import random
+import struct
+import threading
+import time
+
+import numpy as np
+
+from calculations.vector import Vector
+from entities.barrier import Barrier
+from entities.boid import BoidStorage
+from entities.cloud import Cloud
+from game_state import chunks, objects, simulation
+from game_state.neighbors import GridSearch
+
+MAGIC = b"BOIDSAVE"
+VERSION = 3
+
+# magic, version, run time, flock tracing, trace_pending_seconds, boid / cloud / barrier / factor counts,
+# chunk size and step count
+HEADER = struct.Struct("<8sIdBdIIIIdQ")
+
+# Boid storage saved row by row, chunk_cells is rebuilt by the neighbor search.
+# Traces start over when tracing is turned on, so they are only saved while it is.
+BOID_FIELDS = tuple(field for field in BoidStorage.FIELDS if field != "chunk_cells")
+TRACE_FIELDS = ("traces", "trace_heads", "trace_lengths")
+CLOUD_COLUMNS = ("x", "y", "radius", "dx", "dy", "shade")
+BARRIER_COLUMNS = ("x", "y", "radius", "pop")
+
+# random.getstate(): version, 625 words of Mersenne Twister state and gauss_next, NaN when there is none
+RANDOM_STATE = struct.Struct("<I625Id")
+
+
+def _get_boid_dtypes() -> dict[str, tuple[tuple[int, ...], np.dtype]]:
+    storage = BoidStorage()
+    return {field: (getattr(storage, field).shape[1:], getattr(storage, field).dtype.newbyteorder("<"))
+            for field in BOID_FIELDS}
+
+
+BOID_DTYPES = _get_boid_dtypes()
+
+
+def capture(factors: tuple[float, ...]) -> bytes:
+    """
+    The whole world as a checkpoint: simulated time, random module state, the steering factors of the sliders,
+    every boid's storage row, and the clouds and barriers.
+
+    The chunk size and the step count are kept too. The chunk size decides the order the neighbor pairs
+    are summed in, and so the last bits of every force. The step count decides when the grid search measures
+    the chunk size again, so a loaded run does that on the same steps as one that never stopped.
+    """
+    boids = objects.boids
+    header = HEADER.pack(MAGIC, VERSION, simulation.run_time_seconds, boids.tracing, boids.trace_pending_seconds,
+                         len(boids), len(objects.clouds), len(objects.barriers), len(factors),
+                         chunks.CHUNK_SIZE, simulation.step_count)
+
+    version, words, gauss_next = random.getstate()
+    parts = [header,
+             RANDOM_STATE.pack(version, *words, math.nan if gauss_next is None else gauss_next),
+             np.asarray(factors, dtype="<f8").tobytes()]
+
+    for field, (_, dtype) in BOID_DTYPES.items():
+        if field in TRACE_FIELDS and not boids.tracing:
+            continue
+        parts.append(np.ascontiguousarray(getattr(boids.storage, field)[:len(boids)], dtype=dtype).tobytes())
+
+    parts.append(np.array([(c.x, c.y, c.radius, c.direction.dx, c.direction.dy, c.color[0]) for c in objects.clouds],
+                          dtype="<f8").tobytes())
+    parts.append(np.array([(b.x, b.y, b.radius, b.pop) for b in objects.barriers], dtype="<f8").tobytes())
+    return b"".join(parts)
+
+
+def restore(data: bytes) -> tuple[float, ...]:
+    """Replaces the world with a checkpoint made by capture() and returns the steering factors it holds."""
+    magic, version, run_time_seconds, tracing, trace_pending_seconds, *counts = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a checkpoint")
+    if version != VERSION:
+        raise ValueError(f"Version {version} checkpoint, only version {VERSION} can be read")
+    boid_count, cloud_count, barrier_count, factor_count, chunk_size, step_count = counts
+
+    offset = HEADER.size
+    random_version, *words, gauss_next = RANDOM_STATE.unpack_from(data, offset)
+    offset += RANDOM_STATE.size
+
+    def read(dtype: np.dtype, shape: tuple[int, ...]) -> np.ndarray:
+        nonlocal offset
+        array = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        offset += array.nbytes
+        return array
+
+    factors = tuple(read(np.dtype("<f8"), (factor_count,)).tolist())
+    rows = {field: read(dtype, (boid_count, *shape))
+            for field, (shape, dtype) in BOID_DTYPES.items()
+            if tracing or field not in TRACE_FIELDS}
+    cloud_rows = read(np.dtype("<f8"), (cloud_count, len(CLOUD_COLUMNS))).tolist()
+    barrier_rows = read(np.dtype("<f8"), (barrier_count, len(BARRIER_COLUMNS))).tolist()
+
+    objects.clear()
+    objects.boids.set_tracing(bool(tracing))
+    objects.boids.load(rows)
+    objects.boids.trace_pending_seconds = trace_pending_seconds
+
+    for x, y, radius, dx, dy, shade in cloud_rows:
+        cloud = Cloud(x, y, Vector(dx, dy), radius)
+        cloud.color = (int(shade),) * 3
+        objects.clouds.append(cloud)
+    objects.barriers.extend(Barrier(x, y, bool(pop), radius) for x, y, radius, pop in barrier_rows)
+
+    simulation.run_time_seconds = run_time_seconds
+    simulation.step_count = step_count
+    chunks.set_chunk_size(chunk_size)
+    if isinstance(simulation.neighbor_search, GridSearch):
+        simulation.neighbor_search.updates = step_count
+    # Last, the clouds above drew their colors from it
+    random.setstate((random_version, tuple(words), None if math.isnan(gauss_next) else gauss_next))
+    return factors
+
+
+def write_atomically(path: str, data: bytes):
+    """Writes next to path and renames over it, so an interrupted write never leaves a broken checkpoint."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+    os.replace(temporary_path, path)
+
+
+def save(path: str, factors: tuple[float, ...]):
+    write_atomically(path, capture(factors))
+
+
+def load(path: str) -> tuple[float, ...]:
+    with open(path, "rb") as file:
+        return restore(file.read())
+
+
+class Autosaver:
+    """
+    Saves the world every interval seconds. The checkpoint is captured in update(), between steps,
+    and written to disk by a background thread. A save that comes due while the last one is still
+    being written is skipped.
+    """
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self.last_save = time.perf_counter()
+        self.writer: threading.Thread | None = None
+
+    def update(self, factors: tuple[float, ...]):
+        now = time.perf_counter()
+        if now - self.last_save < self.interval or (self.writer is not None and self.writer.is_alive()):
+            return
+
+        self.last_save = now
+        self.writer = threading.Thread(target=write_atomically, args=(self.path, capture(factors)), daemon=True)
+        self.writer.start()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.join()
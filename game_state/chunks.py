@@ -1,31 +1,132 @@
+import math
+import time
+from functools import lru_cache
+
+import numpy as np
+
 from entities.entity import Entity
 
 from entities.boid import SIGHT_DISTANCE
+from surfaces import main_screen_width, main_screen_height
+
+
+CHUNK_SIZE = SIGHT_DISTANCE
+CHUNK_SIZE_CANDIDATES = tuple(SIGHT_DISTANCE * f for f in (1 / 3, 1 / 2, 2 / 3, 1, 3 / 2, 2))
+
+# The grid of the boids. Clouds and barriers have indexes of their own, see BlockGrid, WrappedGrid and BarrierIndex.
+# Every cell keeps its entities in a list, and every entity remembers its cell (current_chunk)
+# and its slot in that list (chunk_index), so moving an entity between cells is O(1).
+chunk_data: dict[tuple[int, int], list[Entity]] = {}
+
+# Neighborhood lists handed out since the index last changed, keyed by (cell, distance)
+neighborhood_cache: dict[tuple[tuple[int, int], float], list[Entity]] = {}
+
 
+def get_chunk_key(x: float, y: float) -> tuple[int, int]:
+    return int(x // CHUNK_SIZE), int(y // CHUNK_SIZE)
 
-CHUNK_SIZE = SIGHT_DISTANCE * 2
-chunk_data = {}
+
+@lru_cache(maxsize=None)
+def get_stencil(cell_size: float, distance: float) -> tuple[int, ...]:
+    """
+    The cells that can hold a point within distance of some point of the cell at (0, 0).
+
+    Returns:
+        For every column offset 0, 1, 2, ... the largest row offset that still intersects the query circle,
+        the stencil is symmetric in both axes.
+    """
+    def gap(offset: int) -> float:
+        return max(0, abs(offset) - 1) * cell_size
+
+    half_heights = []
+    column = 0
+    while gap(column) < distance:
+        row = 0
+        while gap(column) ** 2 + gap(row + 1) ** 2 < distance ** 2:
+            row += 1
+        half_heights.append(row)
+        column += 1
+
+    return tuple(half_heights)
 
 
 def add_to_chunks(*elements: Entity):
 
+    neighborhood_cache.clear()
+
     for elem in elements:
 
-        try:
-            chunk_data[elem.current_chunk].append(elem)
+        elem.current_chunk = get_chunk_key(elem.x, elem.y)
 
+        try:
+            chunk = chunk_data[elem.current_chunk]
         except KeyError:
-            chunk_data[elem.current_chunk] = [elem]
+            chunk = chunk_data[elem.current_chunk] = []
 
+        elem.chunk_index = len(chunk)
+        chunk.append(elem)
 
-def update_chunks_data(*elements: Entity):
 
-    chunk_data.clear()
+def remove_from_chunks(*elements: Entity):
+
+    neighborhood_cache.clear()
 
     for elem in elements:
 
-        elem.current_chunk = ((elem.x // CHUNK_SIZE), (elem.y // CHUNK_SIZE))
-        add_to_chunks(elem)
+        if elem.current_chunk is None:
+            continue
+
+        chunk = chunk_data[elem.current_chunk]
+        last = chunk.pop()
+        if last is not elem:
+            chunk[elem.chunk_index] = last
+            last.chunk_index = elem.chunk_index
+
+        if not chunk:
+            del chunk_data[elem.current_chunk]
+
+        elem.current_chunk = None
+        elem.chunk_index = None
+
+
+def update_chunks_data(*elements: Entity):
+    """Moves the elements whose cell changed since they were last indexed, and indexes new ones."""
+
+    for elem in elements:
+
+        if get_chunk_key(elem.x, elem.y) != elem.current_chunk:
+            remove_from_chunks(elem)
+            add_to_chunks(elem)
+
+
+def update_flock_chunks(flock):
+    """update_chunks_data for a whole flock, finding the boids that changed cell with array operations."""
+
+    cells = np.floor_divide(flock.positions, CHUNK_SIZE).astype(np.int64)
+
+    if flock.chunk_size != CHUNK_SIZE:
+        changed = range(len(flock))
+        flock.chunk_size = CHUNK_SIZE
+    else:
+        changed = np.flatnonzero((cells != flock.chunk_cells).any(axis=1))
+
+    for i in changed:
+        update_chunks_data(flock[i])
+
+    flock.chunk_cells[:] = cells
+
+
+def set_chunk_size(size: float):
+    """Changes the cell size and re-indexes everything that was indexed."""
+    global CHUNK_SIZE
+
+    if size == CHUNK_SIZE:
+        return
+
+    elements = [elem for chunk in chunk_data.values() for elem in chunk]
+    remove_from_chunks(*elements)
+    CHUNK_SIZE = size
+    add_to_chunks(*elements)
 
 
 def get_chunk_data(elem: Entity) -> list[Entity]:
@@ -48,3 +149,297 @@ def get_chunks_data(elem: Entity, radius: int) -> list[Entity]:
             chunks_data.extend(chunk_data.get((x + i, y + j), []))
 
     return chunks_data
+
+
+def get_neighborhood(elem: Entity, distance: float) -> list[Entity]:
+    """
+    Every indexed entity in the cells that intersect the circle of the given distance around elem's cell.
+    Entities sharing a cell share the returned list until the index changes, so it must not be modified.
+    """
+
+    cell = elem.current_chunk
+    if cell is None:
+        # Clouds look into the grid without being indexed in it
+        cell = get_chunk_key(elem.x, elem.y)
+
+    key = (cell, distance)
+    try:
+        return neighborhood_cache[key]
+    except KeyError:
+        pass
+
+    neighborhood: list[Entity] = []
+
+    x, y = cell
+    for i, half_height in enumerate(get_stencil(CHUNK_SIZE, distance)):
+        for column in {x - i, x + i}:
+            for row in range(y - half_height, y + half_height + 1):
+                neighborhood.extend(chunk_data.get((column, row), []))
+
+    neighborhood_cache[key] = neighborhood
+    return neighborhood
+
+
+def _ranges_to_pairs(i: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Expands "i is paired with every j in [start, stop)" into flat (i, j) index arrays
+    counts = np.maximum(stops - starts, 0)
+    total = counts.sum()
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(i, counts), np.repeat(starts, counts) + offsets
+
+
+def neighbor_pairs(positions: np.ndarray, radius: float, cell_size: float | None = None):
+    """
+    Finds every ordered pair (i, j), i != j, of points closer than radius.
+
+    Points are sorted by grid column, then row, so the cells a stencil column covers are one contiguous run.
+    Each point is tested against the rest of its own column run and the whole runs of the columns
+    to its right, which yields every unordered pair once.
+
+    Returns:
+        i, j, and the distance between them, as arrays.
+    """
+    if cell_size is None:
+        cell_size = CHUNK_SIZE
+
+    n = len(positions)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    stencil = get_stencil(cell_size, radius)
+
+    cells = np.floor_divide(positions, cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    columns = cells[:, 0].max() + len(stencil)
+    rows = cells[:, 1].max() + 1
+    keys = cells[:, 0] * rows + cells[:, 1]
+
+    order = np.argsort(keys, kind="stable")
+    cx = cells[order, 0]
+    cy = cells[order, 1]
+    counts = np.bincount(keys, minlength=columns * rows)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    points = np.arange(n)
+
+    # Own column: only later points, so each pair comes up once
+    i_parts, j_parts = zip(
+        _ranges_to_pairs(points, points + 1, ends[cx * rows + np.minimum(cy + stencil[0], rows - 1)]),
+        *(_ranges_to_pairs(points,
+                           starts[(cx + column) * rows + np.maximum(cy - half_height, 0)],
+                           ends[(cx + column) * rows + np.minimum(cy + half_height, rows - 1)])
+          for column, half_height in enumerate(stencil[1:], start=1)))
+
+    i = np.concatenate(i_parts)
+    j = np.concatenate(j_parts)
+    sorted_positions = positions[order]
+    x = np.ascontiguousarray(sorted_positions[:, 0])
+    y = np.ascontiguousarray(sorted_positions[:, 1])
+    distances = np.hypot(x[j] - x[i], y[j] - y[i])
+    keep = distances <= radius
+    i = order[i[keep]]
+    j = order[j[keep]]
+    distances = distances[keep]
+
+    return np.concatenate((i, j)), np.concatenate((j, i)), np.concatenate((distances, distances))
+
+
+def neighbor_pairs_of(positions: np.ndarray, rows: np.ndarray, radius: float, cell_size: float | None = None):
+    """
+    Finds every pair (i, j), i != j, of points closer than radius whose i is one of rows.
+
+    Unlike neighbor_pairs, each of rows is tested against the whole stencil around its cell, on both sides,
+    so the cost follows what rows see rather than the number of points.
+
+    Returns:
+        i, j, and the distance between them, as arrays.
+    """
+    if cell_size is None:
+        cell_size = CHUNK_SIZE
+
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(positions) < 2 or not len(rows):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    stencil = get_stencil(cell_size, radius)
+    reach = len(stencil) - 1
+
+    # Shifted right by reach, so every column the stencil reaches into exists
+    cells = np.floor_divide(positions, cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    cells[:, 0] += reach
+    columns = cells[:, 0].max() + reach + 1
+    grid_rows = cells[:, 1].max() + 1
+    keys = cells[:, 0] * grid_rows + cells[:, 1]
+
+    order = np.argsort(keys, kind="stable")
+    counts = np.bincount(keys, minlength=columns * grid_rows)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+
+    cx = cells[rows, 0]
+    cy = cells[rows, 1]
+    i_parts, j_parts = zip(
+        *(_ranges_to_pairs(rows,
+                           starts[(cx + column) * grid_rows + np.maximum(cy - stencil[abs(column)], 0)],
+                           ends[(cx + column) * grid_rows + np.minimum(cy + stencil[abs(column)], grid_rows - 1)])
+          for column in range(-reach, reach + 1)))
+
+    i = np.concatenate(i_parts)
+    j = order[np.concatenate(j_parts)]
+    distances = np.hypot(positions[j, 0] - positions[i, 0], positions[j, 1] - positions[i, 1])
+    keep = (distances <= radius) & (i != j)
+
+    return i[keep], j[keep], distances[keep]
+
+
+def autotune_chunk_size(positions: np.ndarray,
+                        radius: float = SIGHT_DISTANCE,
+                        candidates: tuple[float, ...] = CHUNK_SIZE_CANDIDATES) -> float:
+    """Times the neighbor query at every candidate cell size for the current positions and keeps the fastest."""
+
+    timings = {}
+    for cell_size in candidates:
+        start = time.perf_counter()
+        neighbor_pairs(positions, radius, cell_size)
+        timings[cell_size] = time.perf_counter() - start
+
+    best = min(timings, key=timings.get)
+    set_chunk_size(best)
+    return best
+
+
+class BlockGrid:
+    """
+    Entities in a grid of square cells, looked up by the block of cells around a point, like the chunks
+    the clouds used to share with the boids. Rebuilt by every update(), as clouds move every step.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], list[Entity]] = {}
+
+    def update(self, elements: list[Entity]):
+        self.cells = {}
+        for elem in elements:
+            self.cells.setdefault((int(elem.x // self.cell_size), int(elem.y // self.cell_size)), []).append(elem)
+
+    def query(self, x: float, y: float, distance: float) -> list[tuple[Entity, tuple[float, float]]]:
+        """
+        Every indexed entity in the cells up to distance / cell_size cells away from the cell of (x, y),
+        the 3 x 3 block around it when distance is the cell size. The offsets are always (0, 0), as in
+        WrappedGrid.query for entities that were not found across an edge.
+        """
+        column, row = int(x // self.cell_size), int(y // self.cell_size)
+        reach = math.ceil(distance / self.cell_size)
+
+        found = []
+        for i in range(column - reach, column + reach + 1):
+            for j in range(row - reach, row + reach + 1):
+                found.extend((elem, (0.0, 0.0)) for elem in self.cells.get((i, j), ()))
+        return found
+
+
+class WrappedGrid:
+    """
+    Entities on the torus the clouds move on (see Cloud.move), in a grid whose cells divide the screen evenly
+    and are at least cell_size wide and high. Rebuilt by every update(), as clouds move every step.
+    """
+
+    def __init__(self, cell_size: float, width: float = main_screen_width, height: float = main_screen_height):
+        self.width = width
+        self.height = height
+        self.columns = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_width = width / self.columns
+        self.cell_height = height / self.rows
+
+        self.cells: dict[tuple[int, int], list[Entity]] = {}
+
+    def update(self, elements: list[Entity]):
+        self.cells = {}
+        for elem in elements:
+            key = int(elem.x // self.cell_width) % self.columns, int(elem.y // self.cell_height) % self.rows
+            self.cells.setdefault(key, []).append(elem)
+
+    def query(self, x: float, y: float, distance: float) -> list[tuple[Entity, tuple[float, float]]]:
+        """
+        Every indexed entity within distance of (x, y) across the screen edges, with the offset
+        that moves it to its copy next to (x, y): (0, 0) unless it was found across an edge.
+        """
+        found = []
+        for column in range(math.floor((x - distance) / self.cell_width),
+                            math.floor((x + distance) / self.cell_width) + 1):
+            offset_x = column // self.columns * self.width
+
+            for row in range(math.floor((y - distance) / self.cell_height),
+                             math.floor((y + distance) / self.cell_height) + 1):
+                offset_y = row // self.rows * self.height
+
+                for elem in self.cells.get((column % self.columns, row % self.rows), ()):
+                    if math.hypot(elem.x + offset_x - x, elem.y + offset_y - y) <= distance:
+                        found.append((elem, (offset_x, offset_y)))
+
+        return found
+
+
+class BarrierIndex:
+    """
+    Barriers by the cells of a fixed grid that their reach touches, their radius included: a point in no such cell
+    is farther than reach from the barrier's edge. Barriers only move while one is being placed, so the index is
+    only rebuilt when update() gets barrier data that differs from the last.
+    """
+
+    def __init__(self, reach: float = SIGHT_DISTANCE, cell_size: float = SIGHT_DISTANCE):
+        self.reach = reach
+        self.cell_size = cell_size
+
+        self.barrier_data = np.zeros((0, 3))
+        # (cell key, barrier row) of every cell a barrier reaches, sorted by key
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.barriers = np.zeros(0, dtype=np.int64)
+        self.rebuilds = 0
+
+    @staticmethod
+    def get_cell_keys(columns, rows):
+        return columns * 2 ** 32 + rows + 2 ** 31
+
+    def update(self, barrier_data: np.ndarray):
+        """barrier_data is x, y and radius of every barrier, see flock.get_barrier_data."""
+        if np.array_equal(barrier_data, self.barrier_data):
+            return
+
+        self.barrier_data = barrier_data.copy()
+        self.rebuilds += 1
+
+        keys = []
+        barriers = []
+        size = self.cell_size
+        for barrier, (x, y, radius) in enumerate(barrier_data.tolist()):
+            reach = radius + self.reach
+            for column in range(math.floor((x - reach) / size), math.floor((x + reach) / size) + 1):
+                gap_x = max(column * size - x, 0, x - (column + 1) * size)
+
+                for row in range(math.floor((y - reach) / size), math.floor((y + reach) / size) + 1):
+                    gap_y = max(row * size - y, 0, y - (row + 1) * size)
+
+                    if gap_x ** 2 + gap_y ** 2 <= reach ** 2:
+                        keys.append(self.get_cell_keys(column, row))
+                        barriers.append(barrier)
+
+        keys = np.array(keys, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.barriers = np.array(barriers, dtype=np.int64)[order]
+
+    def pairs(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(point, barrier row) of every barrier that may reach each point, a superset of the ones that do."""
+        cells = np.floor_divide(positions, self.cell_size).astype(np.int64)
+        keys = self.get_cell_keys(cells[:, 0], cells[:, 1])
+
+        starts = np.searchsorted(self.keys, keys, side="left")
+        stops = np.searchsorted(self.keys, keys, side="right")
+        points, entries = _ranges_to_pairs(np.arange(len(positions)), starts, stops)
+        return points, self.barriers[entries]
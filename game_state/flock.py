@@ -0,0 +1,416 @@
+import numpy as np
+
+from calculations.vector import VectorArray
+from entities.barrier import Barrier
+from game_state import chunks
+from entities.boid import (Boid, BoidStorage, SIGHT_DISTANCE, PERSONAL_SPACE, MAX_SPEED, MIN_SPEED, MAX_FORCE,
+                           WALL_FACTOR, SECONDS_PER_TRACE)
+from surfaces import main_screen_width, main_screen_height
+
+# The per-object force methods bind the comparison result to `dist` in their walrus expressions,
+# so the weight they apply is (SIGHT_DISTANCE - True) ** k for anything in range.
+# The batched forces mirror that so both code paths steer the same way.
+SEPARATION_WEIGHT = (SIGHT_DISTANCE - 1) ** 1.8
+WALL_WEIGHT = (SIGHT_DISTANCE - 1) ** 2
+BARRIER_WEIGHT = (SIGHT_DISTANCE - 1) ** 2 * 100
+
+
+def get_barrier_data(barriers: list[Barrier]) -> np.ndarray:
+    # x, y and radius of every barrier, one row each
+    return np.array([(b.x, b.y, b.radius) for b in barriers], dtype=np.float64).reshape(-1, 3)
+
+
+def get_wall_avoidance_forces(positions: np.ndarray) -> np.ndarray:
+    x = positions[:, 0]
+    y = positions[:, 1]
+    force = np.zeros((len(positions), 2))
+
+    # (boid - wall) offsets for the left, right, top and bottom walls, in Vector coordinates (dy points up)
+    for dist, dx, dy in ((x, x, 0.0 * y),
+                         (main_screen_width - x, x - main_screen_width, 0.0 * y),
+                         (y, 0.0 * x, -y),
+                         (main_screen_height - y, 0.0 * x, main_screen_height - y)):
+        pushes = VectorArray(np.stack((dx, dy), axis=1))
+        pushes.set_magnitudes(WALL_WEIGHT)
+        near = dist < SIGHT_DISTANCE
+        force[near] += pushes.data[near]
+
+    return force
+
+
+def get_barrier_repulsion_forces(positions: np.ndarray,
+                                 barrier_data: np.ndarray,
+                                 barrier_pairs: tuple[np.ndarray, np.ndarray] | None = None) -> np.ndarray:
+    """
+    Args:
+        barrier_pairs: (row, barrier) candidates to test, see chunks.BarrierIndex.pairs. Every barrier is tested
+            against every row without them.
+    """
+    force = np.zeros((len(positions), 2))
+    if not len(barrier_data):
+        return force
+
+    if barrier_pairs is not None:
+        rows, barriers = barrier_pairs
+        dx = positions[rows, 0] - barrier_data[barriers, 0]
+        dy = barrier_data[barriers, 1] - positions[rows, 1]
+        near = np.hypot(dx, dy) - barrier_data[barriers, 2] <= SIGHT_DISTANCE
+
+        pushes = VectorArray(np.stack((dx[near], dy[near]), axis=1))
+        pushes.set_magnitudes(BARRIER_WEIGHT)
+        force[:, 0] = np.bincount(rows[near], pushes.data[:, 0], len(positions))
+        force[:, 1] = np.bincount(rows[near], pushes.data[:, 1], len(positions))
+        return force
+
+    dx = positions[:, 0, None] - barrier_data[None, :, 0]
+    dy = barrier_data[None, :, 1] - positions[:, 1, None]
+    near = np.hypot(dx, dy) - barrier_data[None, :, 2] <= SIGHT_DISTANCE
+
+    # One row per (boid, barrier) pair
+    pushes = VectorArray(np.stack((dx, dy), axis=-1))
+    pushes.set_magnitudes(BARRIER_WEIGHT)
+    force[:] = np.where(near[..., None], pushes.data.reshape(*near.shape, 2), 0.0).sum(axis=1)
+
+    return force
+
+
+def steer(positions: np.ndarray,
+          directions: np.ndarray,
+          barrier_data: np.ndarray,
+          pairs: tuple[np.ndarray, np.ndarray, np.ndarray],
+          dt: float,
+          alignment_factor: float,
+          separation_factor: float,
+          cohesion_factor: float,
+          count: int | None = None,
+          barrier_pairs: tuple[np.ndarray, np.ndarray] | None = None,
+          obstacle_forces: tuple[np.ndarray, np.ndarray] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The flocking step of Flock.flock on plain arrays, so it can run on any slice of the world.
+
+    Only the first count boids steer (all of them by default), the rest are only seen by them.
+    The factors are what the sliders are set to, simulation.SEPARATION_FACTOR and its siblings by default.
+
+    Args:
+        pairs: i, j and their distance for every boid i < count that sees boid j, see NeighborSearch.pairs.
+        barrier_pairs: (boid, barrier) candidates for barrier repulsion, see chunks.BarrierIndex.pairs.
+            Every boid is tested against every barrier without them.
+        obstacle_forces: Wall avoidance and barrier repulsion forces of the first count boids, computed here
+            when omitted, see force_field.ForceField.sample.
+
+    Returns:
+        The new directions and the neighbor counts of the first count boids.
+    """
+    n = len(positions) if count is None else count
+    x, y = positions.T.copy()
+    dx, dy = directions.T.copy()
+    own_directions = directions[:n]
+
+    i, j, distances = pairs
+    counts = np.bincount(i, minlength=n)
+    divisor = np.maximum(counts, 1)[:, None]
+
+    # Alignment
+    average_direction = np.stack((np.bincount(i, dx[j], n), np.bincount(i, dy[j], n)), axis=1) / divisor
+    force = (average_direction - own_directions) * alignment_factor
+
+    # Cohesion, an empty neighborhood averages to the origin just like Vector.get_average
+    average_position = np.stack((np.bincount(i, x[j], n), np.bincount(i, y[j], n)), axis=1) / divisor
+    to_average_position = np.stack((average_position[:, 0] - x[:n], y[:n] - average_position[:, 1]), axis=1)
+    force += (to_average_position - own_directions) * cohesion_factor
+
+    # Separation
+    close = distances < PERSONAL_SPACE
+    ci, cj = i[close], j[close]
+    pushes = VectorArray(np.stack((x[ci] - x[cj], y[cj] - y[ci]), axis=1))
+    pushes.set_magnitudes(SEPARATION_WEIGHT)
+    # bincount of nothing is an int array, even with weights
+    separation_force = np.stack((np.bincount(ci, pushes.data[:, 0], n), np.bincount(ci, pushes.data[:, 1], n)),
+                                axis=1, dtype=np.float64)
+    if obstacle_forces is None:
+        if barrier_pairs is not None:
+            steering = barrier_pairs[0] < n
+            barrier_pairs = barrier_pairs[0][steering], barrier_pairs[1][steering]
+        obstacle_forces = (get_wall_avoidance_forces(positions[:n]),
+                           get_barrier_repulsion_forces(positions[:n], barrier_data, barrier_pairs))
+    wall_force, barrier_force = obstacle_forces
+
+    separation_force += barrier_force
+    force += separation_force * separation_factor
+
+    force += wall_force * WALL_FACTOR
+
+    force *= dt
+    VectorArray(force).clamp_magnitudes(MAX_FORCE)
+    new_directions = own_directions + force
+    VectorArray(new_directions).clamp_magnitudes(MAX_SPEED, min_=MIN_SPEED)
+
+    return new_directions, counts
+
+
+def move_positions(positions: np.ndarray, directions: np.ndarray, dt: float):
+    """Moves every row of positions along its direction in place, bouncing off the screen edges."""
+    positions[:, 0] += directions[:, 0] * dt
+    positions[:, 1] -= directions[:, 1] * dt
+
+    for axis, limit in ((0, main_screen_width), (1, main_screen_height)):
+        outside = (positions[:, axis] < 0) | (positions[:, axis] > limit)
+        directions[outside, axis] *= -1
+        np.clip(positions[:, axis], 0, limit, out=positions[:, axis])
+
+
+class Flock(list):
+    """
+    A list of Boids whose positions, directions and neighbor counts live in contiguous arrays.
+
+    Each member Boid is a view over its row, so per-object code (drawing, removal, the UI) keeps working,
+    while flock() and move() update the whole flock with batched array operations. Rows follow their boids
+    through every change to the list, so row i is always the storage of self[i].
+    """
+
+    def __init__(self, boids=(), capacity: int = 256):
+        super().__init__()
+        self.storage = BoidStorage(capacity)
+        # Cell size the chunk_cells of the members were computed with
+        self.chunk_size = None
+        # Positions before the last move(), for drawing in between steps
+        self.previous_positions = None
+        self.trace_pending_seconds = 0.0
+        self.extend(boids)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.storage.positions[:len(self)]
+
+    @property
+    def directions(self) -> np.ndarray:
+        return self.storage.directions[:len(self)]
+
+    @property
+    def neighbors_count(self) -> np.ndarray:
+        return self.storage.neighbors_count[:len(self)]
+
+    @property
+    def chunk_cells(self) -> np.ndarray:
+        return self.storage.chunk_cells[:len(self)]
+
+    @property
+    def steering(self) -> np.ndarray:
+        return self.storage.steering[:len(self)]
+
+    @property
+    def update_intervals(self) -> np.ndarray:
+        return self.storage.update_intervals[:len(self)]
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self.storage.positions):
+            return
+
+        new_capacity = max(capacity, 2 * len(self.storage.positions))
+        storage = BoidStorage(new_capacity)
+        storage.copy_rows(self.storage, slice(len(self)), slice(len(self)))
+        storage.tracing = self.storage.tracing
+        self.storage = storage
+
+        for i, boid in enumerate(self):
+            boid.storage = storage
+            boid.index = i
+
+    def _compact(self):
+        # Rows are packed again in list order after members have been removed
+        order = np.fromiter((boid.index for boid in self), dtype=np.int64, count=len(self))
+        self.storage.copy_rows(self.storage, order, slice(len(self)))
+
+        for i, boid in enumerate(self):
+            boid.index = i
+
+    def _replace(self, members: list[Boid]):
+        # Makes members the contents, in that order, in a new storage their rows are copied to
+        if len({id(boid) for boid in members}) != len(members):
+            raise ValueError("A boid can only be in a flock once")
+
+        kept = {id(boid) for boid in members}
+        for boid in self:
+            if id(boid) not in kept:
+                boid.detach()
+
+        storage = BoidStorage(max(len(members), 256))
+        storage.tracing = self.storage.tracing
+        for i, boid in enumerate(members):
+            boid.attach(storage, i)
+
+        self.storage = storage
+        super().clear()
+        super().extend(members)
+        self.previous_positions = None
+
+    def append(self, boid: Boid):
+        self.previous_positions = None
+        self._reserve(len(self) + 1)
+        boid.attach(self.storage, len(self))
+        super().append(boid)
+
+    def extend(self, boids):
+        for boid in boids:
+            self.append(boid)
+
+    def __iadd__(self, boids):
+        self.extend(boids)
+        return self
+
+    def __imul__(self, count):
+        raise TypeError("A boid can only be in a flock once")
+
+    def insert(self, index: int, boid: Boid):
+        members = list(self)
+        members.insert(index, boid)
+        self._replace(members)
+
+    def __setitem__(self, key, value):
+        members = list(self)
+        members[key] = value
+        self._replace(members)
+
+    def sort(self, *, key=None, reverse: bool = False):
+        super().sort(key=key, reverse=reverse)
+        self._compact()
+        self.previous_positions = None
+
+    def reverse(self):
+        super().reverse()
+        self._compact()
+        self.previous_positions = None
+
+    def __delitem__(self, key):
+        removed = self[key] if isinstance(key, slice) else [self[key]]
+        for boid in removed:
+            boid.detach()
+        super().__delitem__(key)
+        self._compact()
+        self.previous_positions = None
+
+    def pop(self, index: int = -1) -> Boid:
+        boid = self[index]
+        del self[index]
+        return boid
+
+    def remove(self, boid: Boid):
+        for i, b in enumerate(self):
+            if b is boid:
+                del self[i]
+                return
+        raise ValueError("Boid is not in the flock")
+
+    def remove_many(self, boids):
+        """
+        Removes every one of boids, compacting the rows once however many there are, where removing them
+        one by one would compact them once per boid.
+        """
+        removed = {id(boid) for boid in boids}
+        kept = [boid for boid in self if id(boid) not in removed]
+        if len(kept) + len(removed) != len(self):
+            raise ValueError("Boid is not in the flock")
+
+        for boid in self:
+            if id(boid) in removed:
+                boid.detach()
+        super().clear()
+        super().extend(kept)
+        self._compact()
+        self.previous_positions = None
+
+    def clear(self):
+        for boid in self:
+            boid.detach()
+        super().clear()
+        self.previous_positions = None
+
+    def load(self, rows: dict[str, np.ndarray]):
+        """
+        Replaces the members with one boid per row of rows, which maps BoidStorage fields to their values.
+        The values are copied into a new storage at once and the boids are made as views over it.
+        """
+        self.clear()
+
+        n = len(rows["positions"])
+        storage = BoidStorage(max(n, 256))
+        for field, values in rows.items():
+            getattr(storage, field)[:n] = values
+        storage.tracing = self.storage.tracing
+
+        self.storage = storage
+        self.chunk_size = None
+        super().extend(Boid.view_of(storage, i) for i in range(n))
+
+    @property
+    def tracing(self) -> bool:
+        return self.storage.tracing
+
+    def set_tracing(self, enabled: bool):
+        """Starts or stops recording traces. Trails start over when recording starts again."""
+        if enabled and not self.storage.tracing:
+            self.storage.trace_lengths[:] = 0
+        self.storage.tracing = enabled
+
+    def get_wall_avoidance_forces(self) -> np.ndarray:
+        return get_wall_avoidance_forces(self.positions)
+
+    def get_barrier_repulsion_forces(self, barriers: list[Barrier]) -> np.ndarray:
+        return get_barrier_repulsion_forces(self.positions, get_barrier_data(barriers))
+
+    def flock(self,
+              barriers: list[Barrier],
+              dt: float,
+              alignment_factor: float,
+              separation_factor: float,
+              cohesion_factor: float,
+              neighbor_pairs=chunks.neighbor_pairs,
+              barrier_pairs=None,
+              obstacle_forces=None):
+        """
+        Batched Boid.flock for every member: alignment, cohesion and separation between boids,
+        plus barrier and wall avoidance. All boids steer from the same snapshot of the flock.
+
+        Args:
+            neighbor_pairs: Finds the pairs of boids that see each other, see NeighborSearch.pairs.
+            barrier_pairs: Finds the barriers that may reach each boid, see chunks.BarrierIndex.pairs.
+                Every boid is tested against every barrier when omitted.
+            obstacle_forces: Looks up the wall and barrier forces at every position, see force_field.ForceField.sample.
+                They are computed exactly when omitted.
+        """
+        if len(self) == 0:
+            return
+
+        directions, counts = steer(self.positions,
+                                   self.directions,
+                                   get_barrier_data(barriers),
+                                   neighbor_pairs(self.positions, SIGHT_DISTANCE),
+                                   dt,
+                                   alignment_factor,
+                                   separation_factor,
+                                   cohesion_factor,
+                                   barrier_pairs=None if barrier_pairs is None else barrier_pairs(self.positions),
+                                   obstacle_forces=None if obstacle_forces is None else obstacle_forces(self.positions))
+        self.directions[:] = directions
+        self.neighbors_count[:] = counts
+
+    def move(self, dt: float):
+        """Batched Boid.move for every member, bouncing off the screen edges, recording traces first if enabled."""
+        positions = self.positions
+        directions = self.directions
+
+        if self.storage.tracing:
+            self.trace_pending_seconds += dt
+            if self.trace_pending_seconds > SECONDS_PER_TRACE:
+                self.trace_pending_seconds = 0.0
+                self.storage.record_traces(np.arange(len(self)))
+
+        self.previous_positions = positions.copy()
+        move_positions(positions, directions, dt)
+
+    def interpolated_positions(self, alpha: float) -> np.ndarray:
+        """Positions alpha of the way from before the last move() to now, or the current ones if unknown."""
+        if alpha >= 1.0 or self.previous_positions is None:
+            return self.positions
+
+        return self.previous_positions + (self.positions - self.previous_positions) * alpha
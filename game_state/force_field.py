@@ -0,0 +1,92 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+from entities.boid import SIGHT_DISTANCE
+from game_state.chunks import BarrierIndex
+from game_state.flock import get_barrier_repulsion_forces, get_wall_avoidance_forces
+from surfaces import main_screen_width, main_screen_height
+
+# Pixels between the nodes the forces are sampled at
+FIELD_CELL_SIZE = 4
+
+
+class ForceField:
+    """
+    The wall avoidance and barrier repulsion forces sampled on a grid of nodes over the screen, so the obstacle forces
+    on any number of boids are a bilinear lookup each, however many barriers there are.
+
+    The forces are stored rather than a signed distance and its gradient: every barrier in range pushes with
+    the same strength, and overlapping ones add up, which a distance to the nearest obstacle can't tell.
+    Walls never change and are sampled once. The barrier forces are sampled again only around a barrier
+    that was added, removed or resized, the area its reach covered before and after.
+
+    Sampled forces blur the edge of every obstacle's reach over one cell, and near a barrier's center,
+    where the direction of its push turns around.
+    """
+
+    def __init__(self,
+                 cell_size: float = FIELD_CELL_SIZE,
+                 width: float = main_screen_width,
+                 height: float = main_screen_height):
+        self.cell_size = cell_size
+        self.columns = math.ceil(width / cell_size)
+        self.rows = math.ceil(height / cell_size)
+
+        # Node (row, column) sits at (column, row) * cell_size
+        node_x, node_y = np.meshgrid(np.arange(self.columns + 1) * cell_size, np.arange(self.rows + 1) * cell_size)
+        self.nodes = np.stack((node_x, node_y), axis=2)
+
+        # Per node: wall force x and y, barrier force x and y
+        self.forces = np.zeros((self.rows + 1, self.columns + 1, 4))
+        self.forces[:, :, 0:2] = get_wall_avoidance_forces(self.nodes.reshape(-1, 2)).reshape(self.rows + 1,
+                                                                                               self.columns + 1, 2)
+
+        self.barrier_data = np.zeros((0, 3))
+        self.barrier_index = BarrierIndex()
+        self.resampled_nodes = 0
+
+    def update(self, barrier_data: np.ndarray):
+        """barrier_data is x, y and radius of every barrier, see flock.get_barrier_data."""
+        if np.array_equal(barrier_data, self.barrier_data):
+            return
+
+        before = Counter(map(tuple, self.barrier_data.tolist()))
+        after = Counter(map(tuple, barrier_data.tolist()))
+        changed = list((before - after).elements()) + list((after - before).elements())
+
+        self.barrier_data = barrier_data.copy()
+        self.barrier_index.update(barrier_data)
+        for x, y, radius in changed:
+            self._resample(x, y, radius + SIGHT_DISTANCE)
+
+    def _resample(self, x: float, y: float, reach: float):
+        # Every node within reach of (x, y), on a square around it
+        c0 = max(0, math.floor((x - reach) / self.cell_size))
+        c1 = min(self.columns, math.ceil((x + reach) / self.cell_size))
+        r0 = max(0, math.floor((y - reach) / self.cell_size))
+        r1 = min(self.rows, math.ceil((y + reach) / self.cell_size))
+        if c0 > c1 or r0 > r1:
+            return
+
+        nodes = self.nodes[r0:r1 + 1, c0:c1 + 1].reshape(-1, 2)
+        forces = get_barrier_repulsion_forces(nodes, self.barrier_data, self.barrier_index.pairs(nodes))
+        self.forces[r0:r1 + 1, c0:c1 + 1, 2:4] = forces.reshape(r1 - r0 + 1, c1 - c0 + 1, 2)
+        self.resampled_nodes += len(nodes)
+
+    def sample(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """The wall avoidance and barrier repulsion forces at every position, interpolated between nodes."""
+        gx = np.clip(positions[:, 0] / self.cell_size, 0, self.columns)
+        gy = np.clip(positions[:, 1] / self.cell_size, 0, self.rows)
+        column = np.minimum(gx.astype(np.int64), self.columns - 1)
+        row = np.minimum(gy.astype(np.int64), self.rows - 1)
+        tx = (gx - column)[:, None]
+        ty = (gy - row)[:, None]
+
+        forces = self.forces
+        top = forces[row, column] * (1 - tx) + forces[row, column + 1] * tx
+        bottom = forces[row + 1, column] * (1 - tx) + forces[row + 1, column + 1] * tx
+        sampled = top * (1 - ty) + bottom * ty
+
+        return sampled[:, 0:2], sampled[:, 2:4]
@@ -0,0 +1,185 @@
+from typing import Callable
+
+import numpy as np
+
+from calculations.vector import VectorArray
+from entities.barrier import Barrier
+from entities.boid import SIGHT_DISTANCE, MAX_SPEED, MIN_SPEED
+from game_state.flock import Flock, get_barrier_data, steer
+from game_state.neighbors import NeighborSearch
+
+# (neighbors, steps between steerings), most crowded first: a boid steers at the interval of the first row
+# whose neighbor count it reaches
+UPDATE_INTERVALS = ((5, 1), (1, 2), (0, 4))
+
+# Steps between steerings of every boid while the boids aren't drawn
+HIDDEN_UPDATE_INTERVAL = 4
+
+
+class StaggeredSteering:
+    """
+    Steers only part of the flock every step. A boid whose update interval is K steers every K-th step,
+    boids with the same interval spread evenly over those steps by their row, and in between the boid keeps
+    turning by as much as its last steering turned it. The steps are counted by the caller, the simulation
+    passes its step_count, which checkpoints keep, so a loaded run steers the same boids on the same steps.
+
+    The interval comes from how crowded the boid was when it last steered: its own neighbor count, or
+    the average of its neighbors' when that is higher, so the edge of a dense flock keeps up with its middle.
+    Boids near a barrier steer every step, they would fly into it otherwise. While the boids aren't drawn,
+    hidden is set and every boid steers only every HIDDEN_UPDATE_INTERVAL steps.
+
+    Staggering only pays while fewer than half of the boids are due. On a step where more are, the pairs of
+    the whole flock cost no more than picking out theirs, so every boid steers, as in Flock.flock, and
+    the intervals are worked out again only every longest interval steps, no boid waits longer than that anyway.
+    """
+
+    def __init__(self,
+                 intervals: tuple[tuple[int, int], ...] = UPDATE_INTERVALS,
+                 hidden_interval: int = HIDDEN_UPDATE_INTERVAL):
+        self.intervals = intervals
+        self.hidden_interval = hidden_interval
+        self.hidden = False
+
+        self.steered = 0
+        self.boid_steps = 0
+
+    def due(self, boids: Flock, step: int) -> np.ndarray:
+        """The rows of the boids that steer on the given step."""
+        intervals = self.hidden_interval if self.hidden else boids.update_intervals
+        return np.flatnonzero((step + np.arange(len(boids))) % intervals == 0)
+
+    def get_intervals(self, crowd: np.ndarray) -> np.ndarray:
+        intervals = np.empty(len(crowd), dtype=np.int64)
+        for neighbors, interval in reversed(self.intervals):
+            intervals[crowd >= neighbors] = interval
+        return intervals
+
+    def flock(self,
+              boids: Flock,
+              barriers: list[Barrier],
+              dt: float,
+              step: int,
+              neighbor_search: NeighborSearch,
+              alignment_factor: float,
+              separation_factor: float,
+              cohesion_factor: float,
+              barrier_pairs=None,
+              obstacle_forces=None):
+        """
+        Flock.flock for the boids due on the given step, the others keep turning. Arguments as for Flock.flock,
+        except that the pairs come from neighbor_search.pairs_of, for the boids that steer only.
+        """
+        n = len(boids)
+        if n == 0:
+            return
+
+        rows = self.due(boids, step)
+        self.boid_steps += n
+        factors = (alignment_factor, separation_factor, cohesion_factor)
+        if 2 * len(rows) >= n:
+            self.steered += n
+            self._steer_all(boids, barriers, dt, step, neighbor_search, factors, barrier_pairs, obstacle_forces)
+            return
+
+        self.steered += len(rows)
+        coasting = np.ones(n, dtype=bool)
+        coasting[rows] = False
+        coasting = np.flatnonzero(coasting)
+
+        if len(rows):
+            self._steer(boids, rows, coasting, barriers, dt, neighbor_search, factors, barrier_pairs, obstacle_forces)
+
+        # After steering, which sees every boid as it was at the start of the step
+        if len(coasting):
+            directions = boids.directions[coasting] + boids.steering[coasting] * dt
+            VectorArray(directions).clamp_magnitudes(MAX_SPEED, min_=MIN_SPEED)
+            boids.directions[coasting] = directions
+
+    def _steer_all(self,
+                   boids: Flock,
+                   barriers: list[Barrier],
+                   dt: float,
+                   step: int,
+                   neighbor_search: NeighborSearch,
+                   factors: tuple[float, float, float],
+                   barrier_pairs: Callable | None,
+                   obstacle_forces: Callable | None):
+        positions = boids.positions
+        i, j, distances = neighbor_search.pairs(positions, SIGHT_DISTANCE)
+        forces = None if obstacle_forces is None else obstacle_forces(positions)
+        candidates = None if barrier_pairs is None else barrier_pairs(positions)
+        directions, counts = steer(positions,
+                                   boids.directions,
+                                   get_barrier_data(barriers),
+                                   (i, j, distances),
+                                   dt,
+                                   *factors,
+                                   barrier_pairs=candidates,
+                                   obstacle_forces=forces)
+
+        if step % max(interval for _, interval in self.intervals) == 0:
+            boids.update_intervals[:] = self.get_update_intervals(boids, i, j, counts, forces, candidates)
+        boids.steering[:] = (directions - boids.directions) / dt
+        boids.directions[:] = directions
+        boids.neighbors_count[:] = counts
+
+    def _steer(self,
+               boids: Flock,
+               rows: np.ndarray,
+               coasting: np.ndarray,
+               barriers: list[Barrier],
+               dt: float,
+               neighbor_search: NeighborSearch,
+               factors: tuple[float, float, float],
+               barrier_pairs: Callable | None,
+               obstacle_forces: Callable | None):
+        positions = boids.positions
+        i, j, distances = neighbor_search.pairs_of(positions, rows, SIGHT_DISTANCE)
+        # steer() steers the first count boids, so the ones due go first
+        order = np.concatenate((rows, coasting))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        i = rank[i]
+
+        forces = None if obstacle_forces is None else obstacle_forces(positions[rows])
+        candidates = None if barrier_pairs is None else barrier_pairs(positions[rows])
+        directions, counts = steer(positions[order],
+                                   boids.directions[order],
+                                   get_barrier_data(barriers),
+                                   (i, rank[j], distances),
+                                   dt,
+                                   *factors,
+                                   count=len(rows),
+                                   barrier_pairs=candidates,
+                                   obstacle_forces=forces)
+
+        boids.update_intervals[rows] = self.get_update_intervals(boids, i, j, counts, forces, candidates)
+        boids.steering[rows] = (directions - boids.directions[rows]) / dt
+        boids.directions[rows] = directions
+        boids.neighbors_count[rows] = counts
+
+    def get_update_intervals(self,
+                             boids: Flock,
+                             i: np.ndarray,
+                             j: np.ndarray,
+                             counts: np.ndarray,
+                             forces: tuple[np.ndarray, np.ndarray] | None,
+                             candidates: tuple[np.ndarray, np.ndarray] | None) -> np.ndarray:
+        """
+        The update intervals of the boids just steered, from their pairs: i counts the steered boids, j is
+        the row of the boid seen. Reads the neighbor counts of the last steering, so it goes before they are set.
+        """
+        # How crowded the neighbors were on average, when that is more than the boid itself
+        seen = np.bincount(i, boids.neighbors_count[j], len(counts)) / np.maximum(counts, 1)
+        intervals = self.get_intervals(np.maximum(counts, seen))
+        if forces is not None:
+            barrier_forces = forces[1]
+            intervals[(barrier_forces[:, 0] != 0) | (barrier_forces[:, 1] != 0)] = 1
+        elif candidates is not None:
+            intervals[candidates[0]] = 1
+        return intervals
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "steered_rate": self.steered / self.boid_steps if self.boid_steps else 0.0,
+        }
@@ -0,0 +1,261 @@
+import numpy as np
+
+from entities.entity import Entity
+from game_state import chunks
+
+
+class NeighborSearch:
+    """
+    How the simulation finds what is near what.
+
+    update() is called once per step before any query, pairs() finds every pair of boids within a radius
+    for the batched flock, pairs_of() only the pairs of some of the boids, and query_boids() returns the boids
+    near one element for per-object code such as Cloud.drift. query_boids() may return extra boids,
+    callers filter by distance.
+
+    Only boids are searched here. Clouds and barriers have indexes of their own, chunks.BlockGrid or
+    chunks.WrappedGrid and chunks.BarrierIndex, whatever the search.
+    """
+
+    name = None
+
+    def update(self, boids, barriers: list, clouds: list):
+        raise NotImplementedError("Update method not implemented")
+
+    def pairs(self, positions: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        raise NotImplementedError("Pairs method not implemented")
+
+    def pairs_of(self,
+                 positions: np.ndarray,
+                 rows: np.ndarray,
+                 radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The pairs of pairs() whose first boid is one of rows. Searches that can, find only those."""
+        i, j, distances = self.pairs(positions, radius)
+        wanted = np.zeros(len(positions), dtype=bool)
+        wanted[rows] = True
+        keep = wanted[i]
+        return i[keep], j[keep], distances[keep]
+
+    def query_boids(self, elem: Entity, distance: float) -> list[Entity]:
+        raise NotImplementedError("Query method not implemented")
+
+    def stats(self) -> dict[str, float] | None:
+        """Counters worth showing next to the render cache statistics, if the search keeps any."""
+        return None
+
+
+class GridSearch(NeighborSearch):
+    """The incremental uniform grid of game_state.chunks, with its cell size re-measured every autotune_steps."""
+
+    name = "grid"
+
+    def __init__(self, autotune_steps: int | None = 300):
+        self.autotune_steps = autotune_steps
+        self.updates = 0
+
+    def update(self, boids, barriers: list, clouds: list):
+        if self.autotune_steps is not None and self.updates % self.autotune_steps == 0:
+            chunks.autotune_chunk_size(boids.positions)
+        self.updates += 1
+
+        chunks.update_flock_chunks(boids)
+
+    def pairs(self, positions: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return chunks.neighbor_pairs(positions, radius)
+
+    def pairs_of(self,
+                 positions: np.ndarray,
+                 rows: np.ndarray,
+                 radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return chunks.neighbor_pairs_of(positions, rows, radius)
+
+    def query_boids(self, elem: Entity, distance: float) -> list[Entity]:
+        return chunks.get_neighborhood(elem, distance)
+
+
+class VerletSearch(GridSearch):
+    """
+    The grid search, whose pairs within radius + skin are kept as candidates for the following steps.
+    Every step only measures the candidate pairs again. The candidates are searched again once some boid
+    has moved more than half the skin since they were, as two boids further apart than radius + skin
+    back then can't have come within radius of each other yet.
+
+    A larger skin rebuilds less often, at the cost of more candidates to measure every step.
+    """
+
+    name = "verlet"
+    DEFAULT_SKIN = 20.0
+
+    def __init__(self, skin: float = DEFAULT_SKIN, autotune_steps: int | None = 300):
+        super().__init__(autotune_steps)
+        self.skin = skin
+
+        self.radius: float | None = None
+        self.reference_positions: np.ndarray | None = None
+        # Boids sorted by grid cell, and every unordered candidate pair once as positions in that order,
+        # so measuring them reads nearby memory
+        self.order = np.zeros(0, dtype=np.int64)
+        self.candidates = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+        self.queries = 0
+        self.rebuilds = 0
+        self.measured_pairs = 0
+        self.kept_pairs = 0
+
+    def needs_rebuild(self, positions: np.ndarray, radius: float) -> bool:
+        if self.reference_positions is None or radius != self.radius:
+            return True
+        # Boids joined or left, and the rows may no longer be the boids the candidates were found for
+        if len(positions) != len(self.reference_positions):
+            return True
+        if not len(positions):
+            return False
+
+        displacements = positions - self.reference_positions
+        return np.einsum("ij,ij->i", displacements, displacements).max() > (self.skin / 2) ** 2
+
+    def rebuild(self, positions: np.ndarray, radius: float):
+        reach = radius + self.skin
+        i, j, _ = chunks.neighbor_pairs(positions, reach, cell_size=reach)
+        # neighbor_pairs lists every pair once and then again swapped
+        half = len(i) // 2
+        cells = np.floor_divide(positions, reach).astype(np.int64)
+        self.order = np.lexsort((cells[:, 1], cells[:, 0]))
+        rank = np.empty_like(self.order)
+        rank[self.order] = np.arange(len(self.order))
+        i, j = rank[i[:half]], rank[j[:half]]
+        by_i = np.argsort(i, kind="stable")
+        self.candidates = i[by_i], j[by_i]
+
+        self.reference_positions = positions.copy()
+        self.radius = radius
+        self.rebuilds += 1
+
+    def pairs(self, positions: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        self.queries += 1
+        if self.needs_rebuild(positions, radius):
+            self.rebuild(positions, radius)
+
+        i, j = self.candidates
+        sorted_positions = positions[self.order]
+        x = np.ascontiguousarray(sorted_positions[:, 0])
+        y = np.ascontiguousarray(sorted_positions[:, 1])
+        dx = x[j] - x[i]
+        dy = y[j] - y[i]
+        keep = dx * dx + dy * dy <= radius * radius
+        distances = np.hypot(dx[keep], dy[keep])
+        i = self.order[i[keep]]
+        j = self.order[j[keep]]
+        self.measured_pairs += len(keep)
+        self.kept_pairs += len(i)
+
+        return np.concatenate((i, j)), np.concatenate((j, i)), np.concatenate((distances, distances))
+
+    def stats(self) -> dict[str, float]:
+        """Hits are steps that reused the candidates, misses are rebuilds."""
+        return {
+            "candidate_pairs": len(self.candidates[0]),
+            "hits": self.queries - self.rebuilds,
+            "misses": self.rebuilds,
+            "hit_rate": 1 - self.rebuilds / self.queries if self.queries else 0.0,
+            "steps_per_rebuild": self.queries / self.rebuilds if self.rebuilds else 0.0,
+            # Share of the measured candidates that were within radius, over all steps
+            "kept_rate": self.kept_pairs / self.measured_pairs if self.measured_pairs else 0.0,
+        }
+
+
+class KDTreeSearch(NeighborSearch):
+    """
+    A KD-tree rebuilt every step, which keeps its cost when the flock packs into one dense ball.
+    Needs scipy, which is not in requirements.txt.
+    """
+
+    name = "kdtree"
+
+    def __init__(self):
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError as e:
+            raise ImportError("The kdtree neighbor search needs scipy installed") from e
+
+        self.tree_type = cKDTree
+        self.tree = None
+        self.boids: list[Entity] = []
+
+    def update(self, boids, barriers: list, clouds: list):
+        self.boids = list(boids)
+        self.tree = self.tree_type(boids.positions) if len(boids) else None
+
+    def get_tree(self, positions: np.ndarray):
+        # The tree of update() when positions are still the ones it was built on, as they are within a step
+        if self.tree is not None and np.array_equal(self.tree.data, positions):
+            return self.tree
+        return self.tree_type(positions)
+
+    def pairs(self, positions: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        pairs = self.get_tree(positions).query_pairs(radius, output_type="ndarray")
+        i, j = pairs[:, 0], pairs[:, 1]
+        distances = np.hypot(positions[j, 0] - positions[i, 0], positions[j, 1] - positions[i, 1])
+        return np.concatenate((i, j)), np.concatenate((j, i)), np.concatenate((distances, distances))
+
+    def pairs_of(self,
+                 positions: np.ndarray,
+                 rows: np.ndarray,
+                 radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.asarray(rows, dtype=np.int64)
+        seen = self.get_tree(positions).query_ball_point(positions[rows], radius)
+        i = np.repeat(rows, [len(found) for found in seen])
+        j = np.fromiter((index for found in seen for index in found), dtype=np.int64, count=len(i))
+        distances = np.hypot(positions[j, 0] - positions[i, 0], positions[j, 1] - positions[i, 1])
+        keep = i != j
+        return i[keep], j[keep], distances[keep]
+
+    def query_boids(self, elem: Entity, distance: float) -> list[Entity]:
+        if self.tree is None:
+            return []
+        return [self.boids[i] for i in self.tree.query_ball_point((elem.x, elem.y), distance)]
+
+
+class BruteForceSearch(NeighborSearch):
+    """Tests every pair. Only for small flocks, and as the reference the other searches are checked against."""
+
+    name = "brute"
+
+    def __init__(self):
+        self.boids: list[Entity] = []
+
+    def update(self, boids, barriers: list, clouds: list):
+        self.boids = list(boids)
+
+    def pairs(self, positions: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        distances = np.hypot(positions[:, None, 0] - positions[None, :, 0],
+                             positions[:, None, 1] - positions[None, :, 1])
+        np.fill_diagonal(distances, np.inf)
+        i, j = np.nonzero(distances <= radius)
+        return i, j, distances[i, j]
+
+    def pairs_of(self,
+                 positions: np.ndarray,
+                 rows: np.ndarray,
+                 radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.asarray(rows, dtype=np.int64)
+        distances = np.hypot(positions[rows, None, 0] - positions[None, :, 0],
+                             positions[rows, None, 1] - positions[None, :, 1])
+        distances[np.arange(len(rows)), rows] = np.inf
+        k, j = np.nonzero(distances <= radius)
+        return rows[k], j, distances[k, j]
+
+    def query_boids(self, elem: Entity, distance: float) -> list[Entity]:
+        return self.boids
+
+
+NEIGHBOR_SEARCHES: dict[str, type[NeighborSearch]] = {
+    search.name: search for search in (GridSearch, VerletSearch, KDTreeSearch, BruteForceSearch)
+}
+
+
+def create_neighbor_search(name: str) -> NeighborSearch:
+    try:
+        return NEIGHBOR_SEARCHES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown neighbor search {name!r}, expected one of {', '.join(NEIGHBOR_SEARCHES)}")
@@ -5,10 +5,12 @@ from calculations.vector import Vector
 from entities.boid import Boid, MAX_SPEED
 from entities.barrier import Barrier
 from entities.cloud import Cloud
+from game_state import chunks
+from game_state.flock import Flock
 from surfaces import main_screen_width, main_screen_height
 
 BOID_COUNT = 130
-boids: list[Boid] = []
+boids: Flock = Flock()
 
 barriers: list[Barrier] = []
 
@@ -16,9 +18,17 @@ clouds: list[Cloud] = []
 
 
 def same_instance_filter(x: list, remove_condition: callable):
-    for i in range(len(x) - 1, -1, -1):
-        if remove_condition(x[i]):
-            del x[i]
+    removed = [element for element in x if remove_condition(element)]
+    if not removed:
+        return
+
+    chunks.remove_from_chunks(*removed)
+    # All at once, a flock compacts its rows after every single removal
+    if isinstance(x, Flock):
+        x.remove_many(removed)
+    else:
+        removed_ids = {id(element) for element in removed}
+        x[:] = [element for element in x if id(element) not in removed_ids]
 
 
 def remove_element(*mouse_pos: tuple[int, int]):
@@ -34,8 +44,8 @@ def remove_small_balloons():
     same_instance_filter(clouds, lambda c: c.radius < c.MIN_RADIUS)
 
 
-def add_boids():
-    for _ in range(BOID_COUNT):
+def add_boids(count: int = BOID_COUNT):
+    for _ in range(count):
         radians = random.uniform(0, 2 * math.pi) % (2 * math.pi)
         x = random.uniform(0, main_screen_width)
         y = random.uniform(0, main_screen_height)
@@ -48,5 +58,11 @@ def add_boids():
         )
 
 
-def init():
-    add_boids()
+def clear():
+    for elements in (boids, barriers, clouds):
+        chunks.remove_from_chunks(*elements)
+        elements.clear()
+
+
+def init(boid_count: int = BOID_COUNT):
+    add_boids(boid_count)
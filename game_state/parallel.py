@@ -0,0 +1,201 @@
+import atexit
+import math
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from entities.barrier import Barrier
+from entities.boid import SIGHT_DISTANCE
+from game_state import chunks
+from game_state.flock import Flock, get_barrier_data, steer
+
+# Arrays the workers share with the main process: trailing shape and dtype of every row
+SHARED_FIELDS = {
+    "positions": ((2,), np.float64),
+    "directions": ((2,), np.float64),
+    "new_directions": ((2,), np.float64),
+    "neighbors_count": ((), np.int64),
+    # Wall force x and y, then barrier force x and y, when they are looked up before the tiles are steered
+    "obstacle_forces": ((4,), np.float64),
+}
+
+
+class SharedFlockArrays:
+    """SHARED_FIELDS for up to capacity boids, each in its own shared memory block."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.blocks: dict[str, SharedMemory] = {}
+        self.arrays: dict[str, np.ndarray] = {}
+
+        for field, (shape, dtype) in SHARED_FIELDS.items():
+            size = capacity * math.prod(shape) * np.dtype(dtype).itemsize
+            block = self.blocks[field] = SharedMemory(create=True, size=max(size, 1))
+            self.arrays[field] = np.ndarray((capacity, *shape), dtype=dtype, buffer=block.buf)
+
+    @property
+    def names(self) -> dict[str, str]:
+        return {field: block.name for field, block in self.blocks.items()}
+
+    def close(self):
+        # The arrays hold on to the buffers, they go first
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+
+# Blocks a worker process has attached to, by block name
+_attached: dict[str, tuple[SharedMemory, np.ndarray]] = {}
+
+
+def _attach(names: dict[str, str], capacity: int) -> dict[str, np.ndarray]:
+    for name in set(_attached) - set(names.values()):
+        block, _ = _attached.pop(name)
+        block.close()
+
+    arrays = {}
+    for field, name in names.items():
+        if name not in _attached:
+            shape, dtype = SHARED_FIELDS[field]
+            block = SharedMemory(name=name)
+            _attached[name] = (block, np.ndarray((capacity, *shape), dtype=dtype, buffer=block.buf))
+        arrays[field] = _attached[name][1]
+
+    return arrays
+
+
+def _steer_tile(task: tuple):
+    """
+    Runs in a worker: steers the boids whose cell lies in one tile, seeing every boid within
+    SIGHT_DISTANCE of the tile, and writes their new directions and neighbor counts back.
+    """
+    names, capacity, n, tile, cell_size, barrier_data, dt, factors, has_obstacle_forces = task
+    arrays = _attach(names, capacity)
+
+    positions = arrays["positions"][:n]
+    cells = np.floor_divide(positions, cell_size).astype(np.int64)
+    cx, cy = cells[:, 0], cells[:, 1]
+
+    x0, y0, x1, y1 = tile
+    owned = np.flatnonzero((x0 <= cx) & (cx < x1) & (y0 <= cy) & (cy < y1))
+    if not len(owned):
+        return
+
+    halo = math.ceil(SIGHT_DISTANCE / cell_size)
+    seen = (x0 - halo <= cx) & (cx < x1 + halo) & (y0 - halo <= cy) & (cy < y1 + halo)
+    seen[owned] = False
+    rows = np.concatenate((owned, np.flatnonzero(seen)))
+
+    local_positions = positions[rows]
+    i, j, distances = chunks.neighbor_pairs(local_positions, SIGHT_DISTANCE, cell_size)
+    mine = i < len(owned)
+
+    obstacle_forces = None
+    if has_obstacle_forces:
+        obstacle_forces = arrays["obstacle_forces"][owned, 0:2], arrays["obstacle_forces"][owned, 2:4]
+
+    new_directions, counts = steer(local_positions,
+                                   arrays["directions"][rows],
+                                   barrier_data,
+                                   (i[mine], j[mine], distances[mine]),
+                                   dt,
+                                   *factors,
+                                   count=len(owned),
+                                   obstacle_forces=obstacle_forces)
+    arrays["new_directions"][owned] = new_directions
+    arrays["neighbors_count"][owned] = counts
+
+
+class ParallelFlock:
+    """
+    Runs Flock.flock on a process pool. The world is cut into square tiles of whole game_state.chunks cells,
+    and every worker steers the boids of one tile at a time from the shared position and direction arrays.
+
+    Boids steer from the same snapshot either way, so the result is the one of Flock.flock up to
+    the order floating point sums are taken in.
+    """
+
+    def __init__(self, workers: int | None = None, tiles_per_worker: int = 4):
+        self.workers = workers or os.cpu_count()
+        self.tiles_per_worker = tiles_per_worker
+
+        # Forked workers don't re-run the importing script, which opens the window in main.py
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        # Started before the workers so they share it, instead of each unlinking the blocks it attached to on exit
+        resource_tracker.ensure_running()
+        self.pool = context.Pool(self.workers)
+        self.shared: SharedFlockArrays | None = None
+
+        atexit.register(self.close)
+
+    def _reserve(self, capacity: int):
+        if self.shared is not None and capacity <= self.shared.capacity:
+            return
+
+        old_capacity = 0
+        if self.shared is not None:
+            old_capacity = self.shared.capacity
+            self.shared.close()
+        self.shared = SharedFlockArrays(max(capacity, 2 * old_capacity, 256))
+
+    def get_tiles(self, positions: np.ndarray, cell_size: float) -> list[tuple[int, int, int, int]]:
+        """(first column, first row, end column, end row) of tiles that cover every occupied cell."""
+        cells = np.floor_divide(positions, cell_size).astype(np.int64)
+        (x0, y0), (x1, y1) = cells.min(axis=0), cells.max(axis=0) + 1
+
+        tile_count = self.workers * self.tiles_per_worker
+        side = max(1, math.ceil(math.sqrt((x1 - x0) * (y1 - y0) / tile_count)))
+
+        return [(int(x), int(y), int(x + side), int(y + side))
+                for x in range(x0, x1, side)
+                for y in range(y0, y1, side)]
+
+    def flock(self,
+              flock: Flock,
+              barriers: list[Barrier],
+              dt: float,
+              alignment_factor: float,
+              separation_factor: float,
+              cohesion_factor: float,
+              obstacle_forces=None):
+        """Flock.flock with the work spread over the pool. obstacle_forces is looked up here, before the pool runs."""
+        n = len(flock)
+        if n == 0:
+            return
+
+        self._reserve(n)
+        arrays = self.shared.arrays
+        arrays["positions"][:n] = flock.positions
+        arrays["directions"][:n] = flock.directions
+        if obstacle_forces is not None:
+            arrays["obstacle_forces"][:n] = np.concatenate(obstacle_forces(flock.positions), axis=1)
+
+        cell_size = chunks.CHUNK_SIZE
+        barrier_data = get_barrier_data(barriers)
+        factors = (alignment_factor, separation_factor, cohesion_factor)
+        names = self.shared.names
+        capacity = self.shared.capacity
+
+        has_obstacle_forces = obstacle_forces is not None
+        self.pool.map(_steer_tile, [(names, capacity, n, tile, cell_size, barrier_data, dt, factors,
+                                     has_obstacle_forces)
+                                    for tile in self.get_tiles(flock.positions, cell_size)])
+
+        flock.directions[:] = arrays["new_directions"][:n]
+        flock.neighbors_count[:] = arrays["neighbors_count"][:n]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
@@ -0,0 +1,175 @@
+import os
+import queue
+import struct
+import threading
+import warnings
+
+import numpy as np
+
+from entities.barrier import Barrier
+from entities.boid import Boid
+from entities.cloud import Cloud
+from game_state.flock import Flock
+from surfaces import main_screen_width, main_screen_height
+
+MAGIC = b"BOIDTRAJ"
+VERSION = 1
+
+# magic, version, boid / cloud / barrier capacity, dt, screen width and height, padded to HEADER_SIZE
+HEADER = struct.Struct("<8sIIIIfII")
+HEADER_SIZE = 64
+
+# Columns of the per-entity rows of a frame
+BOID_COLUMNS = ("x", "y", "dx", "dy", "neighbors_count")
+CLOUD_COLUMNS = ("x", "y", "radius", "shade")
+BARRIER_COLUMNS = ("x", "y", "radius")
+
+
+def get_frame_dtype(boid_capacity: int, cloud_capacity: int, barrier_capacity: int) -> np.dtype:
+    """
+    One fixed-size frame block: simulated time, how many rows of each table are used, then the float32 tables.
+    Every frame has the same size, so frame k starts at HEADER_SIZE + k * itemsize.
+    """
+    return np.dtype([("time", "<f4"),
+                     ("boid_count", "<u4"),
+                     ("cloud_count", "<u4"),
+                     ("barrier_count", "<u4"),
+                     ("boids", "<f4", (boid_capacity, len(BOID_COLUMNS))),
+                     ("clouds", "<f4", (cloud_capacity, len(CLOUD_COLUMNS))),
+                     ("barriers", "<f4", (barrier_capacity, len(BARRIER_COLUMNS)))])
+
+
+class TrajectoryRecorder:
+    """
+    Appends a frame per record() call to a trajectory file. Frames are handed to a writer thread through
+    a bounded queue, so record() never waits on the disk. When the writer falls queue_size frames behind,
+    frames are dropped and counted instead.
+
+    Entities past the capacities given here are not recorded.
+    """
+
+    def __init__(self,
+                 path: str,
+                 dt: float,
+                 boid_capacity: int,
+                 cloud_capacity: int = 64,
+                 barrier_capacity: int = 64,
+                 queue_size: int = 256):
+        self.capacities = (boid_capacity, cloud_capacity, barrier_capacity)
+        self.frame_dtype = get_frame_dtype(*self.capacities)
+        self.frames = 0
+        self.dropped = 0
+        self.truncated = 0
+
+        self.file = open(path, "wb")
+        header = HEADER.pack(MAGIC, VERSION, *self.capacities, dt, main_screen_width, main_screen_height)
+        self.file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+        self.queue: queue.Queue[bytes | None] = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._write, daemon=True)
+        self.writer.start()
+
+    def _write(self):
+        while (block := self.queue.get()) is not None:
+            self.file.write(block)
+
+    def record(self, time: float, boids: Flock, barriers: list[Barrier], clouds: list[Cloud]):
+        boid_capacity, cloud_capacity, barrier_capacity = self.capacities
+        frame = np.zeros((), dtype=self.frame_dtype)
+        frame["time"] = time
+
+        n = min(len(boids), boid_capacity)
+        frame["boid_count"] = n
+        frame["boids"][:n, 0:2] = boids.positions[:n]
+        frame["boids"][:n, 2:4] = boids.directions[:n]
+        frame["boids"][:n, 4] = boids.neighbors_count[:n]
+
+        cloud_rows = [(c.x, c.y, c.radius, c.color[0]) for c in clouds[:cloud_capacity]]
+        frame["cloud_count"] = len(cloud_rows)
+        frame["clouds"][:len(cloud_rows)] = np.reshape(cloud_rows, (-1, len(CLOUD_COLUMNS)))
+
+        barrier_rows = [(b.x, b.y, b.radius) for b in barriers[:barrier_capacity]]
+        frame["barrier_count"] = len(barrier_rows)
+        frame["barriers"][:len(barrier_rows)] = np.reshape(barrier_rows, (-1, len(BARRIER_COLUMNS)))
+
+        if n < len(boids) or len(cloud_rows) < len(clouds) or len(barrier_rows) < len(barriers):
+            self.truncated += 1
+
+        try:
+            self.queue.put_nowait(frame.tobytes())
+            self.frames += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        self.queue.put(None)
+        self.writer.join()
+        self.file.close()
+
+        if self.dropped:
+            warnings.warn(f"{self.dropped} frames were dropped, the disk could not keep up")
+        if self.truncated:
+            warnings.warn(f"{self.truncated} frames held more entities than the recording capacities")
+
+
+class TrajectoryReplay:
+    """
+    A trajectory file memory-mapped as an array of frames, any of which is read in O(1).
+    A frame being written as the file is opened is left out.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+
+        magic, version, *capacities, dt, width, height = HEADER.unpack_from(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trajectory file")
+        if version != VERSION:
+            raise ValueError(f"{path} is a version {version} trajectory, only version {VERSION} can be read")
+
+        self.dt = dt
+        self.screen_size = (width, height)
+        self.frame_dtype = get_frame_dtype(*capacities)
+        # Whole frames only, the bytes of a frame that was still being written are left out
+        count = max(os.path.getsize(path) - HEADER_SIZE, 0) // self.frame_dtype.itemsize
+        if count:
+            self.frames = np.memmap(path, dtype=self.frame_dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            # memmap can't map nothing
+            self.frames = np.zeros(0, dtype=self.frame_dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def apply(self, index: int, boids: Flock, barriers: list[Barrier], clouds: list[Cloud]):
+        """Makes the world look like frame index. Boids keep their objects when their count doesn't change."""
+        frame = self.frames[index]
+
+        n = int(frame["boid_count"])
+        previous_positions = boids.positions.copy() if len(boids) == n else None
+        if len(boids) > n:
+            del boids[n:]
+        boids.extend(Boid() for _ in range(n - len(boids)))
+
+        rows = frame["boids"][:n]
+        boids.positions[:] = rows[:, 0:2]
+        boids.directions[:] = rows[:, 2:4]
+        boids.neighbors_count[:] = rows[:, 4]
+        boids.previous_positions = previous_positions
+
+        cloud_rows = frame["clouds"][:int(frame["cloud_count"])].tolist()
+        if len(clouds) != len(cloud_rows):
+            clouds[:] = [Cloud(x, y) for x, y, _, _ in cloud_rows]
+        for cloud, (x, y, radius, shade) in zip(clouds, cloud_rows):
+            cloud.x, cloud.y, cloud.radius = x, y, radius
+            cloud.color = (int(shade),) * 3
+
+        barrier_rows = frame["barriers"][:int(frame["barrier_count"])].tolist()
+        if len(barriers) != len(barrier_rows):
+            barriers[:] = [Barrier(x, y, False) for x, y, _ in barrier_rows]
+        for barrier, (x, y, radius) in zip(barriers, barrier_rows):
+            barrier.x, barrier.y, barrier.radius = x, y, radius
@@ -0,0 +1,104 @@
+import math
+import time
+from typing import Callable
+
+# Fewest steps a real time frame may catch up, however few fit into a frame
+MIN_STEPS_PER_FRAME = 5
+
+
+class FixedStepScheduler:
+    """
+    Decides how many fixed physics steps run for each rendered frame.
+
+    In real time, the wall time between frames is accumulated and consumed in step_dt slices, so the simulation
+    keeps its speed whatever the render rate, and alpha tells how far into the next step the frame is drawn.
+
+    Fast-forward ignores the wall clock: a positive fast_forward_steps runs that many steps per frame,
+    0 runs as many steps as fit into render_interval seconds before the next frame is drawn.
+
+    A stalled frame (window dragged, breakpoint) only catches up max_steps_per_frame steps, the rest is dropped.
+    Unless it is given, that is twice the steps of a frame, so every rate keeps up with real time.
+    """
+
+    def __init__(self,
+                 step_dt: float,
+                 max_steps_per_frame: int | None = None,
+                 render_interval: float = 1 / 30):
+        self.fixed_max_steps_per_frame = max_steps_per_frame
+        self.set_rates(step_dt, render_interval)
+
+        self.fast_forward_steps: int | None = None
+        self.accumulator = 0.0
+        self.last_time: float | None = None
+        self.alpha = 1.0
+
+    def set_rates(self, step_dt: float, render_interval: float):
+        """Sets the seconds of a step and of a frame, and the steps a frame may catch up that follow from them."""
+        self.step_dt = step_dt
+        self.render_interval = render_interval
+        self.max_steps_per_frame = self.fixed_max_steps_per_frame
+        if self.max_steps_per_frame is None:
+            self.max_steps_per_frame = max(MIN_STEPS_PER_FRAME, math.ceil(render_interval / step_dt) * 2)
+
+    @property
+    def fast_forwarding(self) -> bool:
+        return self.fast_forward_steps is not None
+
+    def set_fast_forward(self, steps: int | None):
+        """None returns to real time, 0 runs unbounded, K > 0 runs K steps per frame."""
+        if steps is not None and steps < 0:
+            raise ValueError("Fast-forward steps can't be negative")
+
+        self.fast_forward_steps = steps
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def toggle_fast_forward(self, steps: int = 0):
+        self.set_fast_forward(None if self.fast_forwarding else steps)
+
+    def skip_frame(self):
+        """A frame in which the simulation doesn't run (paused), its time is not made up for later."""
+        self.last_time = time.perf_counter()
+
+    def run_frame(self, step: Callable[[float], None]) -> int:
+        """Calls step(step_dt) as many times as this frame needs and returns how many that was."""
+        now = time.perf_counter()
+        elapsed = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+
+        if self.fast_forward_steps is None:
+            return self._run_real_time(step, elapsed)
+
+        steps = 0
+        if self.fast_forward_steps > 0:
+            for _ in range(self.fast_forward_steps):
+                step(self.step_dt)
+            steps = self.fast_forward_steps
+        else:
+            deadline = now + self.render_interval
+            while steps == 0 or time.perf_counter() < deadline:
+                step(self.step_dt)
+                steps += 1
+
+        # The last step is what is drawn
+        self.alpha = 1.0
+        self.last_time = time.perf_counter()
+        return steps
+
+    def _run_real_time(self, step: Callable[[float], None], elapsed: float) -> int:
+        self.accumulator += elapsed
+
+        steps = 0
+        while self.accumulator >= self.step_dt and steps < self.max_steps_per_frame:
+            step(self.step_dt)
+            self.accumulator -= self.step_dt
+            steps += 1
+
+        if self.accumulator >= self.step_dt:
+            self.accumulator %= self.step_dt
+
+        self.alpha = self.accumulator / self.step_dt
+        return steps
+
+
+scheduler = FixedStepScheduler(step_dt=1 / 30)
@@ -0,0 +1,357 @@
+import math
+import multiprocessing
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from entities.boid import SIGHT_DISTANCE
+from game_state import chunks
+from game_state.flock import steer, move_positions
+from surfaces import main_screen_height
+
+# First byte of every frame a shard receives, the rest is the payload
+HELLO_COORDINATOR = b"C"
+HELLO_NEIGHBOR = b"N"
+INIT = b"I"
+STEP = b"S"
+SNAPSHOT = b"P"
+STOP = b"Q"
+
+FRAME_HEADER = struct.Struct("!Q")
+STEP_ARGUMENTS = struct.Struct("!dddd")
+COUNT = struct.Struct("!I")
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def receive_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed in the middle of a frame")
+        data += chunk
+    return bytes(data)
+
+
+def receive_frame(sock: socket.socket) -> bytes:
+    size, = FRAME_HEADER.unpack(receive_exactly(sock, FRAME_HEADER.size))
+    return receive_exactly(sock, size)
+
+
+def pack_boids(ids: np.ndarray, positions: np.ndarray, directions: np.ndarray) -> bytes:
+    # Little-endian raw arrays behind a row count, nothing is pickled
+    return b"".join((COUNT.pack(len(ids)),
+                     ids.astype("<i8").tobytes(),
+                     positions.astype("<f8").tobytes(),
+                     directions.astype("<f8").tobytes()))
+
+
+def unpack_boids(data: bytes, offset: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """ids, positions and directions packed at offset, and the offset just past them."""
+    n, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    ids = np.frombuffer(data, dtype="<i8", count=n, offset=offset).astype(np.int64)
+    offset += 8 * n
+    positions = np.frombuffer(data, dtype="<f8", count=2 * n, offset=offset).reshape(n, 2).astype(np.float64)
+    offset += 16 * n
+    directions = np.frombuffer(data, dtype="<f8", count=2 * n, offset=offset).reshape(n, 2).astype(np.float64)
+    offset += 16 * n
+    return ids, positions, directions, offset
+
+
+def get_strip_bounds(index: int, count: int) -> tuple[float, float]:
+    # The outer strips reach past the screen edges, so every y belongs to exactly one strip
+    top = index * main_screen_height / count if index > 0 else -math.inf
+    bottom = (index + 1) * main_screen_height / count if index < count - 1 else math.inf
+    return top, bottom
+
+
+class Shard:
+    """
+    The boids of one horizontal strip of the world, plus the halo: copies of the boids just across
+    its boundaries that its own boids can see.
+
+    Every step, each shard sends the boids within SIGHT_DISTANCE of a boundary to the strip across it (outgoing()).
+    The receiving shard adopts the ones that moved into its strip and keeps the rest as halo (exchange()),
+    then steps its own boids against its own and halo boids (step()).
+    """
+
+    def __init__(self, index: int, count: int, barrier_data: np.ndarray | None = None):
+        if main_screen_height / count < SIGHT_DISTANCE:
+            raise ValueError(f"{count} strips are narrower than SIGHT_DISTANCE, halos would span several strips")
+
+        self.index = index
+        self.count = count
+        self.top, self.bottom = get_strip_bounds(index, count)
+        self.barrier_data = np.zeros((0, 3)) if barrier_data is None else barrier_data
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.directions = np.zeros((0, 2))
+        self.neighbors_count = np.zeros(0, dtype=np.int64)
+
+        self.halo_positions = np.zeros((0, 2))
+        self.halo_directions = np.zeros((0, 2))
+
+    def owns(self, positions: np.ndarray) -> np.ndarray:
+        return (self.top <= positions[:, 1]) & (positions[:, 1] < self.bottom)
+
+    def add(self, ids: np.ndarray, positions: np.ndarray, directions: np.ndarray):
+        self.ids = np.concatenate((self.ids, ids))
+        self.positions = np.concatenate((self.positions, positions))
+        self.directions = np.concatenate((self.directions, directions))
+        self.neighbors_count = np.concatenate((self.neighbors_count, np.zeros(len(ids), dtype=np.int64)))
+
+    def outgoing(self) -> dict[int, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Boids to send to the strip above (-1) and below (+1), including the ones that moved into it."""
+        y = self.positions[:, 1]
+        sides = {}
+        if self.index > 0:
+            sides[-1] = y < self.top + SIGHT_DISTANCE
+        if self.index < self.count - 1:
+            sides[1] = y >= self.bottom - SIGHT_DISTANCE
+
+        return {side: (self.ids[near], self.positions[near], self.directions[near]) for side, near in sides.items()}
+
+    def exchange(self, incoming: list[tuple[np.ndarray, np.ndarray, np.ndarray]]):
+        """Takes what the neighboring strips sent, hands over the boids that left and rebuilds the halo."""
+        staying = self.owns(self.positions)
+
+        # Boids that left this strip are still seen from here this step, the neighbor now steps them
+        halo_positions = [self.positions[~staying]]
+        halo_directions = [self.directions[~staying]]
+
+        self.ids = self.ids[staying]
+        self.positions = self.positions[staying]
+        self.directions = self.directions[staying]
+        self.neighbors_count = self.neighbors_count[staying]
+
+        for ids, positions, directions in incoming:
+            arrived = self.owns(positions)
+            self.add(ids[arrived], positions[arrived], directions[arrived])
+            halo_positions.append(positions[~arrived])
+            halo_directions.append(directions[~arrived])
+
+        self.halo_positions = np.concatenate(halo_positions)
+        self.halo_directions = np.concatenate(halo_directions)
+
+    def step(self,
+             dt: float,
+             alignment_factor: float,
+             separation_factor: float,
+             cohesion_factor: float):
+        n = len(self.ids)
+        if n == 0:
+            return
+
+        positions = np.concatenate((self.positions, self.halo_positions))
+        directions = np.concatenate((self.directions, self.halo_directions))
+        i, j, distances = chunks.neighbor_pairs(positions, SIGHT_DISTANCE)
+        mine = i < n
+
+        self.directions, self.neighbors_count = steer(positions,
+                                                      directions,
+                                                      self.barrier_data,
+                                                      (i[mine], j[mine], distances[mine]),
+                                                      dt,
+                                                      alignment_factor,
+                                                      separation_factor,
+                                                      cohesion_factor,
+                                                      count=n)
+        move_positions(self.positions, self.directions, dt)
+
+
+def _connect(address: tuple[str, int], timeout: float = 30.0) -> socket.socket:
+    # The other side may still be starting up
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            sock = socket.create_connection(address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def _exchange_halos(shard: Shard, neighbors: dict[int, socket.socket]):
+    outgoing = shard.outgoing()
+
+    # Neighbors send to each other at the same time, so sending can't wait for the other side to read
+    senders = [threading.Thread(target=send_frame, args=(neighbors[side], pack_boids(*outgoing[side])))
+               for side in neighbors]
+    for sender in senders:
+        sender.start()
+    incoming = [unpack_boids(receive_frame(neighbors[side]))[:3] for side in neighbors]
+    for sender in senders:
+        sender.join()
+
+    shard.exchange(incoming)
+
+
+def serve_shard(listener: socket.socket, index: int, count: int, next_address: tuple[str, int] | None):
+    """
+    Runs the shard of strip index until the coordinator stops it.
+
+    The shard connects to the strip below at next_address, and accepts the coordinator and the strip above
+    on listener.
+    """
+    neighbors: dict[int, socket.socket] = {}
+    if next_address is not None:
+        neighbors[1] = _connect(next_address)
+        send_frame(neighbors[1], HELLO_NEIGHBOR)
+
+    coordinator = None
+    while coordinator is None or (index > 0 and -1 not in neighbors):
+        conn, _ = listener.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if receive_frame(conn) == HELLO_NEIGHBOR:
+            neighbors[-1] = conn
+        else:
+            coordinator = conn
+    listener.close()
+
+    shard = Shard(index, count)
+    try:
+        while True:
+            frame = receive_frame(coordinator)
+            command, payload = frame[:1], frame[1:]
+
+            if command == INIT:
+                barrier_count, = COUNT.unpack_from(payload)
+                barrier_bytes = 24 * barrier_count
+                shard.barrier_data = np.frombuffer(payload, dtype="<f8", count=3 * barrier_count,
+                                                   offset=COUNT.size).reshape(-1, 3).astype(np.float64)
+                shard.add(*unpack_boids(payload, COUNT.size + barrier_bytes)[:3])
+                send_frame(coordinator, COUNT.pack(len(shard.ids)))
+
+            elif command == STEP:
+                dt, alignment_factor, separation_factor, cohesion_factor = STEP_ARGUMENTS.unpack(payload)
+                _exchange_halos(shard, neighbors)
+                shard.step(dt, alignment_factor, separation_factor, cohesion_factor)
+                send_frame(coordinator, COUNT.pack(len(shard.ids)))
+
+            elif command == SNAPSHOT:
+                send_frame(coordinator, pack_boids(shard.ids, shard.positions, shard.directions)
+                           + shard.neighbors_count.astype("<i8").tobytes())
+
+            elif command == STOP:
+                return
+
+            else:
+                raise ValueError(f"Unknown shard command {command!r}")
+    finally:
+        coordinator.close()
+        for sock in neighbors.values():
+            sock.close()
+
+
+class Snapshot:
+    """The whole world assembled from every shard, ordered by boid id. Draws like a Flock with boid_blits()."""
+
+    def __init__(self, ids: np.ndarray, positions: np.ndarray, directions: np.ndarray, neighbors_count: np.ndarray):
+        order = np.argsort(ids)
+        self.ids = ids[order]
+        self.positions = positions[order]
+        self.directions = directions[order]
+        self.neighbors_count = neighbors_count[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Coordinator:
+    """Drives the shards step by step and assembles snapshots of the whole world from them."""
+
+    def __init__(self, addresses: list[tuple[str, int]]):
+        self.shards: list[socket.socket] = []
+        for address in addresses:
+            sock = _connect(address)
+            send_frame(sock, HELLO_COORDINATOR)
+            self.shards.append(sock)
+
+        self.boid_counts = [0] * len(addresses)
+
+    def _gather(self) -> list[bytes]:
+        return [receive_frame(sock) for sock in self.shards]
+
+    def init(self, positions: np.ndarray, directions: np.ndarray, barrier_data: np.ndarray | None = None):
+        """Hands every boid to the shard of its strip, boid ids are their rows in positions."""
+        barrier_data = np.zeros((0, 3)) if barrier_data is None else barrier_data
+        barrier_payload = COUNT.pack(len(barrier_data)) + barrier_data.astype("<f8").tobytes()
+        ids = np.arange(len(positions))
+
+        for index, sock in enumerate(self.shards):
+            top, bottom = get_strip_bounds(index, len(self.shards))
+            mine = (top <= positions[:, 1]) & (positions[:, 1] < bottom)
+            send_frame(sock, INIT + barrier_payload + pack_boids(ids[mine], positions[mine], directions[mine]))
+
+        self.boid_counts = [COUNT.unpack(reply)[0] for reply in self._gather()]
+
+    def step(self,
+             dt: float,
+             alignment_factor: float,
+             separation_factor: float,
+             cohesion_factor: float):
+        """One step of the whole world, every shard steps in parallel and this waits for all of them."""
+        payload = STEP + STEP_ARGUMENTS.pack(dt, alignment_factor, separation_factor, cohesion_factor)
+        for sock in self.shards:
+            send_frame(sock, payload)
+
+        self.boid_counts = [COUNT.unpack(reply)[0] for reply in self._gather()]
+
+    def snapshot(self) -> Snapshot:
+        for sock in self.shards:
+            send_frame(sock, SNAPSHOT)
+
+        parts = []
+        for reply in self._gather():
+            ids, positions, directions, offset = unpack_boids(reply)
+            neighbors_count = np.frombuffer(reply, dtype="<i8", count=len(ids), offset=offset).astype(np.int64)
+            parts.append((ids, positions, directions, neighbors_count))
+
+        return Snapshot(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+    def close(self):
+        for sock in self.shards:
+            try:
+                send_frame(sock, STOP)
+            except OSError:
+                pass
+            sock.close()
+        self.shards = []
+
+
+def launch_local_shards(count: int, host: str = "127.0.0.1") -> tuple[list[tuple[str, int]], list]:
+    """
+    Starts count shard processes on this machine, listening on free loopback ports.
+
+    Returns:
+        Their addresses in strip order, for Coordinator, and the processes.
+    """
+    listeners = []
+    for _ in range(count):
+        listener = socket.create_server((host, 0))
+        listeners.append(listener)
+    addresses = [listener.getsockname()[:2] for listener in listeners]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    processes = []
+    for index, listener in enumerate(listeners):
+        next_address = addresses[index + 1] if index < count - 1 else None
+        process = context.Process(target=serve_shard, args=(listener, index, count, next_address), daemon=True)
+        process.start()
+        processes.append(process)
+
+    for listener in listeners:
+        listener.close()
+
+    return addresses, processes
@@ -0,0 +1,165 @@
+from entities.cloud import Cloud
+from instrumentation import timings
+from game_state.chunks import BarrierIndex, BlockGrid, WrappedGrid
+from game_state.flock import get_barrier_data
+from game_state.force_field import ForceField
+from game_state.level_of_detail import StaggeredSteering
+from game_state.neighbors import NeighborSearch, GridSearch, create_neighbor_search
+from game_state.objects import boids, barriers, clouds
+from game_state.parallel import ParallelFlock
+
+# Starting positions of the separation, alignment and cohesion sliders
+SEPARATION_FACTOR = 0.05
+ALIGNMENT_FACTOR = 1.5
+COHESION_FACTOR = 1.5
+
+neighbor_search: NeighborSearch = GridSearch()
+
+# Clouds move every step, barriers seldom change, so neither shares the boids' search.
+# A cloud sees the clouds in the block of cells around its own, see set_wrapped_clouds() for the alternative.
+cloud_grid: BlockGrid | WrappedGrid = BlockGrid(Cloud.SIGHT_DISTANCE)
+barrier_index = BarrierIndex()
+
+# When set, wall and barrier forces are looked up in it rather than computed for every boid,
+# see set_obstacle_field()
+obstacle_field: ForceField | None = None
+
+# Steers the flock on a process pool when set, see set_workers()
+parallel_flock: ParallelFlock | None = None
+
+# Steers only the boids due every step when set and there are no workers, see set_staggered_steering()
+staggered_steering: StaggeredSteering | None = None
+
+run_time_seconds = 0.0
+# Steps taken since reset(), checkpoints keep it along with run_time_seconds
+step_count = 0
+
+
+def set_neighbor_search(search: NeighborSearch | str):
+    """Selects the neighbor search by instance or by name ("grid", "verlet", "kdtree" or "brute")."""
+    global neighbor_search
+
+    if isinstance(search, str):
+        search = create_neighbor_search(search)
+    neighbor_search = search
+
+
+def set_workers(workers: int):
+    """Steers the flock on that many worker processes, 0 or 1 steps it in this process."""
+    global parallel_flock
+
+    if parallel_flock is not None:
+        parallel_flock.close()
+
+    parallel_flock = ParallelFlock(workers) if workers > 1 else None
+
+
+def set_obstacle_field(enabled: bool):
+    """Looks the obstacle forces up in a ForceField when enabled, computes them exactly for every boid otherwise."""
+    global obstacle_field
+
+    obstacle_field = ForceField() if enabled else None
+
+
+def set_wrapped_clouds(enabled: bool):
+    """
+    When enabled, a cloud sees the clouds within Cloud.SIGHT_DISTANCE, across the screen edges as well.
+    Otherwise it sees every cloud in the 3 x 3 block of Cloud.SIGHT_DISTANCE cells around its own.
+    """
+    global cloud_grid
+
+    cloud_grid = WrappedGrid(Cloud.SIGHT_DISTANCE) if enabled else BlockGrid(Cloud.SIGHT_DISTANCE)
+
+
+def set_staggered_steering(enabled: bool):
+    """Steers crowded boids every step and sparse ones every few steps when enabled, every boid every step otherwise."""
+    global staggered_steering
+
+    staggered_steering = StaggeredSteering() if enabled else None
+
+
+def reset():
+    global run_time_seconds, step_count
+
+    run_time_seconds = 0.0
+    step_count = 0
+
+
+def update_neighbors():
+    neighbor_search.update(boids, barriers, clouds)
+    cloud_grid.update(clouds)
+    if obstacle_field is not None:
+        obstacle_field.update(get_barrier_data(barriers))
+    else:
+        barrier_index.update(get_barrier_data(barriers))
+
+
+def flock_boids(dt: float,
+                separation_factor: float = SEPARATION_FACTOR,
+                alignment_factor: float = ALIGNMENT_FACTOR,
+                cohesion_factor: float = COHESION_FACTOR):
+    obstacle_forces = None if obstacle_field is None else obstacle_field.sample
+
+    if parallel_flock is not None:
+        parallel_flock.flock(boids,
+                             barriers,
+                             dt,
+                             separation_factor=separation_factor,
+                             alignment_factor=alignment_factor,
+                             cohesion_factor=cohesion_factor,
+                             obstacle_forces=obstacle_forces)
+        return
+
+    if staggered_steering is not None:
+        staggered_steering.flock(boids,
+                                 barriers,
+                                 dt,
+                                 step_count,
+                                 neighbor_search,
+                                 separation_factor=separation_factor,
+                                 alignment_factor=alignment_factor,
+                                 cohesion_factor=cohesion_factor,
+                                 barrier_pairs=barrier_index.pairs if obstacle_field is None else None,
+                                 obstacle_forces=obstacle_forces)
+        return
+
+    boids.flock(barriers,
+                dt,
+                separation_factor=separation_factor,
+                alignment_factor=alignment_factor,
+                cohesion_factor=cohesion_factor,
+                neighbor_pairs=neighbor_search.pairs,
+                barrier_pairs=barrier_index.pairs if obstacle_field is None else None,
+                obstacle_forces=obstacle_forces)
+
+
+def move_boids(dt: float):
+    boids.move(dt)
+
+
+def drift_clouds(dt: float):
+    for cloud in clouds:
+        cloud.drift(cloud_grid.query(cloud.x, cloud.y, Cloud.SIGHT_DISTANCE),
+                    neighbor_search.query_boids(cloud, Cloud.SIGHT_DISTANCE),
+                    dt)
+        cloud.move(run_time_seconds=run_time_seconds, dt=dt)
+
+
+def step(dt: float,
+         separation_factor: float = SEPARATION_FACTOR,
+         alignment_factor: float = ALIGNMENT_FACTOR,
+         cohesion_factor: float = COHESION_FACTOR):
+    """Advances every boid and cloud by dt seconds. Needs no display, so it runs headless as well."""
+    global run_time_seconds, step_count
+
+    update_neighbors()
+    timings.mark("neighbors")
+    flock_boids(dt, separation_factor, alignment_factor, cohesion_factor)
+    timings.mark("flock")
+    move_boids(dt)
+    timings.mark("move")
+    drift_clouds(dt)
+    timings.mark("clouds")
+
+    run_time_seconds += dt
+    step_count += 1
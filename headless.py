@@ -0,0 +1,113 @@
+import argparse
+import random
+import time
+
+from game_state import checkpoint, chunks, objects, simulation
+from game_state.neighbors import NEIGHBOR_SEARCHES, GridSearch, VerletSearch
+from game_state.recording import TrajectoryRecorder
+from instrumentation import timings
+
+FPS = 30
+
+
+def run(steps: int,
+        dt: float = 1 / FPS,
+        recorder: TrajectoryRecorder | None = None,
+        factors: tuple[float, float, float] = (simulation.SEPARATION_FACTOR,
+                                               simulation.ALIGNMENT_FACTOR,
+                                               simulation.COHESION_FACTOR)) -> float:
+    """
+    Runs the simulation for a number of steps as fast as possible and returns the steps per second.
+    factors are the separation, alignment and cohesion factors, in the order of the sliders.
+    """
+    separation_factor, alignment_factor, cohesion_factor = factors
+    start = time.perf_counter()
+    for _ in range(steps):
+        timings.start_frame()
+        simulation.step(dt,
+                        separation_factor=separation_factor,
+                        alignment_factor=alignment_factor,
+                        cohesion_factor=cohesion_factor)
+        if recorder is not None:
+            recorder.record(simulation.run_time_seconds, objects.boids, objects.barriers, objects.clouds)
+        timings.end_frame()
+
+    return steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the boids simulation without a display.")
+    parser.add_argument("--steps", type=int, default=1000, help="number of simulation steps to run")
+    parser.add_argument("--boids", type=int, default=objects.BOID_COUNT, help="number of boids to spawn")
+    parser.add_argument("--dt", type=float, default=1 / FPS, help="seconds simulated per step")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random starting positions")
+    parser.add_argument("--neighbors", choices=NEIGHBOR_SEARCHES, default=GridSearch.name,
+                        help="neighbor search backend, kdtree needs scipy")
+    parser.add_argument("--skin", type=float, default=VerletSearch.DEFAULT_SKIN, metavar="PX",
+                        help="how far past the sight distance the verlet search keeps candidate neighbors")
+    parser.add_argument("--chunk-size", type=float, default=None,
+                        help="fixed chunk size in pixels for the grid search, measured automatically when omitted")
+    parser.add_argument("--profile-output", default=None,
+                        help="stream the time of every simulation phase per step to this .csv or .jsonl file")
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="append every step to this trajectory file, main.py --replay plays it back")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="steer the flock on this many processes, 0 steps it in this one")
+    parser.add_argument("--wrapped-clouds", action="store_true",
+                        help="let clouds see the clouds within their sight distance across the screen edges, "
+                             "instead of the ones in the block of cells around their own")
+    parser.add_argument("--obstacle-field", action="store_true",
+                        help="look the wall and barrier forces up in a grid instead of computing them for every boid, "
+                             "faster with many barriers but approximate")
+    parser.add_argument("--staggered", action="store_true",
+                        help="steer crowded boids every step and sparse ones every 2 or 4 steps")
+    parser.add_argument("--load", default=None, metavar="FILE",
+                        help="start from this checkpoint, with its steering factors, instead of --boids new boids")
+    parser.add_argument("--save", default=None, metavar="FILE",
+                        help="save a checkpoint of the world after the last step")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.profile_output is not None:
+        timings.enabled = True
+        timings.start_export(args.profile_output)
+    autotune_steps = {} if args.chunk_size is None else {"autotune_steps": None}
+    if args.chunk_size is not None:
+        chunks.set_chunk_size(args.chunk_size)
+    if args.neighbors == GridSearch.name:
+        simulation.set_neighbor_search(GridSearch(**autotune_steps))
+    elif args.neighbors == VerletSearch.name:
+        simulation.set_neighbor_search(VerletSearch(skin=args.skin, **autotune_steps))
+    else:
+        simulation.set_neighbor_search(args.neighbors)
+    simulation.set_workers(args.workers)
+    simulation.set_obstacle_field(args.obstacle_field)
+    simulation.set_wrapped_clouds(args.wrapped_clouds)
+    simulation.set_staggered_steering(args.staggered)
+    factors = (simulation.SEPARATION_FACTOR, simulation.ALIGNMENT_FACTOR, simulation.COHESION_FACTOR)
+    if args.load is not None:
+        factors = checkpoint.load(args.load)
+    else:
+        objects.init(args.boids)
+
+    recorder = None
+    if args.record is not None:
+        recorder = TrajectoryRecorder(args.record, args.dt, boid_capacity=len(objects.boids))
+
+    steps_per_second = run(args.steps, args.dt, recorder, factors)
+    if recorder is not None:
+        recorder.close()
+    if args.save is not None:
+        checkpoint.save(args.save, factors)
+    timings.stop_export()
+    print(f"{args.steps} steps with {len(objects.boids)} boids using the {simulation.neighbor_search.name} search: "
+          f"{steps_per_second:.1f} steps per second")
+    if (neighbor_stats := simulation.neighbor_search.stats()) is not None:
+        print(f"neighbor lists rebuilt every {neighbor_stats['steps_per_rebuild']:.1f} steps, "
+              f"{neighbor_stats['kept_rate']:.0%} of candidates within sight")
+    if simulation.staggered_steering is not None:
+        print(f"{simulation.staggered_steering.stats()['steered_rate']:.0%} of the boids steered per step")
+
+
+if __name__ == '__main__':
+    main()
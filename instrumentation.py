@@ -0,0 +1,117 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+# Phases of a frame in the order main() runs them, each mark() closes the phase it names
+PHASES = ("events", "clear", "neighbors", "flock", "move", "clouds",
+          "sight", "barriers", "boids", "cloud_draw", "ui", "overlay", "flip", "tick")
+
+
+class FrameTimings:
+    """
+    Wall time of every phase of the last `capacity` frames, kept in a ring.
+
+    Recording only starts or stops at start_frame(), and while it is off every call returns
+    after one attribute check, so the marks can stay in the frame loop for good.
+    """
+
+    def __init__(self, phases: tuple[str, ...] = PHASES, capacity: int = 300):
+        self.phases = phases
+        self.columns = {phase: i for i, phase in enumerate(phases)}
+        self.capacity = capacity
+
+        self.samples = np.zeros((capacity, len(phases)))  # ms per phase
+        self.frame_times = np.zeros(capacity)  # ms per frame
+        self.frames = 0
+
+        self.enabled = False
+        self.recording = False
+        self.frame = np.zeros(len(phases))
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+
+        self.export_file = None
+        self.export_writer = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+    def start_frame(self):
+        self.recording = self.enabled
+        if not self.recording:
+            return
+
+        self.frame[:] = 0.0
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase: str):
+        if not self.recording:
+            return
+
+        now = time.perf_counter()
+        self.frame[self.columns[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.recording:
+            return
+
+        slot = self.frames % self.capacity
+        self.samples[slot] = self.frame
+        self.frame_times[slot] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames += 1
+
+        if self.export_file is not None:
+            self.write_sample(slot)
+
+    def recorded(self) -> int:
+        return min(self.frames, self.capacity)
+
+    def phase_means(self) -> dict[str, float]:
+        if not self.recorded():
+            return {phase: 0.0 for phase in self.phases}
+
+        means = self.samples[:self.recorded()].mean(axis=0)
+        return dict(zip(self.phases, means.tolist()))
+
+    def frame_time_percentiles(self, percentiles: tuple[float, ...] = (50, 95, 99)) -> dict[float, float]:
+        if not self.recorded():
+            return {p: 0.0 for p in percentiles}
+
+        values = np.percentile(self.frame_times[:self.recorded()], percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def start_export(self, path: str):
+        """Streams every recorded frame to path, as CSV for a .csv file and as JSON lines otherwise."""
+        self.stop_export()
+        self.export_file = open(path, "w", newline="")
+
+        if path.endswith(".csv"):
+            self.export_writer = csv.writer(self.export_file)
+            self.export_writer.writerow(("frame", "frame_ms", *self.phases))
+        else:
+            self.export_writer = None
+
+    def stop_export(self):
+        if self.export_file is None:
+            return
+
+        self.export_file.close()
+        self.export_file = None
+        self.export_writer = None
+
+    def write_sample(self, slot: int):
+        frame_ms = round(float(self.frame_times[slot]), 4)
+        phases_ms = [round(v, 4) for v in self.samples[slot].tolist()]
+
+        if self.export_writer is not None:
+            self.export_writer.writerow((self.frames, frame_ms, *phases_ms))
+        else:
+            self.export_file.write(json.dumps({"frame": self.frames,
+                                               "frame_ms": frame_ms,
+                                               "phases_ms": dict(zip(self.phases, phases_ms))}) + "\n")
+
+
+timings = FrameTimings()
@@ -1,22 +1,25 @@
+import argparse
+import os
 import sys
 
 import pygame
 
-from UI.IO import update_current_balloon, is_holding_balloon, handle_event, action_buttons, sliders, \
-    toggle_drawing_buttons, pause_button
-from game_state import chunks, objects
+import surfaces
+from game_state import checkpoint, objects, simulation
+from game_state.neighbors import NEIGHBOR_SEARCHES, GridSearch, VerletSearch
 from game_state.objects import boids, barriers, clouds
-from surfaces import main_screen
+from game_state.recording import TrajectoryRecorder, TrajectoryReplay
+from game_state.scheduler import scheduler
+from instrumentation import timings
+from rendering import barrier as barrier_rendering, cloud as cloud_rendering
+from rendering.assets import assets
+from rendering.dirty import DirtyScreen
+from rendering.overlay import draw_overlay
 
 FPS = 30
 dt = 1 / FPS
-run_time_seconds = 0.0
 
-pygame.init()
-
-pygame.display.set_caption("Boids!")  # Set the window caption
-pygame.display.set_icon(pygame.transform.rotozoom(pygame.image.load("sprites/arrow.png"), 0, 2.5))
-clock = pygame.time.Clock()  # Clock for controlling frame rate
+BACKGROUND_COLOR = (30, 30, 30)
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -26,80 +29,266 @@ GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)
 
 
-def main():
-    global run_time_seconds
+def init_window() -> pygame.Surface:
+    pygame.init()
+
+    pygame.display.set_caption("Boids!")  # Set the window caption
+    pygame.display.set_icon(pygame.transform.rotozoom(assets.get("arrow.png"), 0, 2.5))
+    return surfaces.init_display()
+
+
+def main(recorder: TrajectoryRecorder | None = None,
+         replay: TrajectoryReplay | None = None,
+         load_path: str | None = None,
+         checkpoint_path: str = "world.boidsave",
+         autosaver: checkpoint.Autosaver | None = None,
+         dirty_screen: DirtyScreen | None = None):
+    """
+    Args:
+        recorder: Records every simulation step when given.
+        replay: Plays this trajectory back instead of simulating, arrows and Home/End seek.
+        load_path: Checkpoint the world starts from instead of a new flock.
+        checkpoint_path: Checkpoint F5 saves to and F9 loads from.
+        autosaver: Saves the world periodically when given.
+        dirty_screen: Redraws only what changed every frame when given, instead of the whole screen.
+    """
+    main_screen = init_window()
+    clock = pygame.time.Clock()  # Clock for controlling frame rate
+
+    # Imported once the display exists, the widgets and the boid sprite atlas are made on import
+    # and their sprites are converted to its pixel format as they load
+    from UI.IO import update_current_balloon, is_holding_balloon, get_current_balloon, handle_event, action_buttons, \
+        sliders, toggle_drawing_buttons, pause_button
+    from rendering.scene import draw_world
+
+    replay_frame = 0
+    widgets = [pause_button, *action_buttons, *toggle_drawing_buttons, *sliders]
+
+    def get_factors() -> tuple[float, ...]:
+        return tuple(s.value for s in sliders)
+
+    def load_checkpoint(path: str):
+        for slider, value in zip(sliders, checkpoint.load(path)):
+            slider.set_value(value)
+
+    def is_idle() -> bool:
+        """Nothing on screen changes until the next input event."""
+        return (pause_button.is_pressed
+                and not is_holding_balloon()
+                and not timings.recording
+                and not any(s.dragging for s in sliders))
+
+    def draw_scene() -> list[pygame.Rect]:
+        rects = draw_world(boids, barriers, clouds,
+                           show_boids=toggle_drawing_buttons[0].is_pressed,
+                           show_barriers=toggle_drawing_buttons[1].is_pressed,
+                           show_clouds=toggle_drawing_buttons[2].is_pressed,
+                           show_sight=toggle_drawing_buttons[3].is_pressed,
+                           growing_balloon=get_current_balloon(),
+                           alpha=scheduler.alpha)
+
+        pause_button.draw()
+
+        for b in action_buttons:
+            b.draw()
+            b.draw_outline()
+
+        for b in toggle_drawing_buttons:
+            b.draw()
+            b.draw_outline()
+
+        for s in sliders:
+            s.draw()
+        rects.extend(widget.area for widget in widgets)
+        timings.mark("ui")
+
+        if timings.recording:
+            cache_stats = {"barrier cache": barrier_rendering.cache.stats(),
+                           "cloud cache": cloud_rendering.cache.stats(),
+                           "assets": assets.stats()}
+            if (neighbor_stats := simulation.neighbor_search.stats()) is not None:
+                cache_stats["neighbor lists"] = neighbor_stats
+            rects.append(draw_overlay(timings,
+                                      {"boids": len(boids), "barriers": len(barriers), "clouds": len(clouds)},
+                                      cache_stats))
+            timings.mark("overlay")
+
+        return rects
+
+    def step_world(step_dt: float):
+        if simulation.staggered_steering is not None:
+            simulation.staggered_steering.hidden = not toggle_drawing_buttons[0].is_pressed
+        simulation.step(step_dt,
+                        separation_factor=sliders[0].value,
+                        alignment_factor=sliders[1].value,
+                        cohesion_factor=sliders[2].value)
+        if recorder is not None:
+            recorder.record(simulation.run_time_seconds, boids, barriers, clouds)
+
+    def step_replay(step_dt: float):
+        nonlocal replay_frame
+        replay_frame = min(replay_frame + 1, len(replay) - 1)
+        replay.apply(replay_frame, boids, barriers, clouds)
 
-    objects.init()
-    chunks.update_chunks_data(*boids, *barriers, *clouds)
+    def seek(frame: int):
+        nonlocal replay_frame
+        replay_frame = max(0, min(frame, len(replay) - 1))
+        boids.previous_positions = None
+        replay.apply(replay_frame, boids, barriers, clouds)
+
+    if replay is not None:
+        seek(0)
+    elif load_path is not None:
+        load_checkpoint(load_path)
+    else:
+        objects.init()
 
     while True:
 
+        timings.start_frame()
+
         events = pygame.event.get()
+        if not events and is_idle():
+            # The same frame would be drawn again and again, sleep until there is input instead
+            events = [pygame.event.wait()] + pygame.event.get()
+
         for event in events:
 
             if event.type == pygame.QUIT:
+                timings.stop_export()
+                if recorder is not None:
+                    recorder.close()
+                if autosaver is not None:
+                    autosaver.close()
                 pygame.quit()
                 sys.exit()
 
-            handle_event(event)
+            if replay is not None and event.type == pygame.KEYDOWN:
+                second = round(1 / replay.dt)
+                seek({pygame.K_LEFT: replay_frame - second,
+                      pygame.K_RIGHT: replay_frame + second,
+                      pygame.K_HOME: 0,
+                      pygame.K_END: len(replay) - 1}.get(event.key, replay_frame))
+
+            if replay is None and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F5:
+                    checkpoint.save(checkpoint_path, get_factors())
+                elif event.key == pygame.K_F9 and os.path.exists(checkpoint_path):
+                    load_checkpoint(checkpoint_path)
+
+            if dirty_screen is not None and event.type == pygame.WINDOWEXPOSED:
+                dirty_screen.invalidate()
 
-        main_screen.fill((30, 30, 30))
+            handle_event(event)
 
         update_current_balloon(dt)
-        chunks.update_chunks_data(*boids, *barriers, *clouds)
 
-        if not is_holding_balloon():
+        if not is_holding_balloon() and replay is None:
             objects.remove_small_balloons()
+        timings.mark("events")
 
-        # for boid in boids:
-        #     boid.draw_trace()
-
-        for boid in boids:
-            if not pause_button.is_pressed:
-                boid.flock(chunks.get_chunks_data(boid, 1),
-                           dt,
-                           separation_factor=sliders[0].value,
-                           alignment_factor=sliders[1].value,
-                           cohesion_factor=sliders[2].value)
-                boid.move(dt)
-            if toggle_drawing_buttons[3].is_pressed:
-                boid.draw_sight()
-
-        for bar in barriers:
-            if toggle_drawing_buttons[1].is_pressed:
-                bar.draw()
-
-        for boid in boids:
-            if toggle_drawing_buttons[0].is_pressed:
-                boid.draw()
-
-        for cloud in clouds:
-            if not pause_button.is_pressed:
-                cloud.drift(chunks.get_chunks_data(cloud, 1), dt)
-                cloud.move(run_time_seconds=run_time_seconds, dt=dt)
-            if toggle_drawing_buttons[2].is_pressed:
-                cloud.draw()
+        if pause_button.is_pressed:
+            scheduler.skip_frame()
+        else:
+            scheduler.run_frame(step_world if replay is None else step_replay)
 
-        pause_button.draw()
+        if autosaver is not None:
+            autosaver.update(get_factors())
 
         for b in action_buttons:
             b.update()
-            b.draw()
-            b.draw_outline()
-
-        for b in toggle_drawing_buttons:
-            b.draw()
-            b.draw_outline()
 
         for s in sliders:
             s.update()
-            s.draw()
 
-        pygame.display.flip()
+        if dirty_screen is None:
+            main_screen.fill(BACKGROUND_COLOR)
+            timings.mark("clear")
+            draw_scene()
+            pygame.display.flip()
+        else:
+            changed_widgets = dirty_screen.changed_widgets(widgets)
+            # Paused with only the pointer moving, the world stands still and just the widgets change
+            if (pause_button.is_pressed and not is_holding_balloon() and not timings.recording
+                    and all(event.type == pygame.MOUSEMOTION for event in events)):
+                pygame.display.update(dirty_screen.redraw(changed_widgets, draw_scene))
+            else:
+                pygame.display.update(dirty_screen.draw(draw_scene))
+        timings.mark("flip")
 
         clock.tick(FPS)
-        run_time_seconds += dt
+        timings.mark("tick")
+        timings.end_frame()
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Interactive boids simulation.")
+    parser.add_argument("--neighbors", choices=NEIGHBOR_SEARCHES, default=GridSearch.name,
+                        help="neighbor search backend, kdtree needs scipy")
+    parser.add_argument("--skin", type=float, default=VerletSearch.DEFAULT_SKIN, metavar="PX",
+                        help="how far past the sight distance the verlet search keeps candidate neighbors")
+    parser.add_argument("--profile-output", default=None,
+                        help="record frame timings from the start and stream them to this .csv or .jsonl file "
+                             "(F3 toggles recording and the timing overlay)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="steer the flock on this many processes, 0 steps it in this one")
+    parser.add_argument("--wrapped-clouds", action="store_true",
+                        help="let clouds see the clouds within their sight distance across the screen edges, "
+                             "instead of the ones in the block of cells around their own")
+    parser.add_argument("--obstacle-field", action="store_true",
+                        help="look the wall and barrier forces up in a grid instead of computing them for every boid, "
+                             "faster with many barriers but approximate")
+    parser.add_argument("--staggered", action="store_true",
+                        help="steer crowded boids every step and sparse ones every 2 or 4 steps, "
+                             "and all of them every 4 steps while the boids are hidden")
+    parser.add_argument("--physics-rate", type=float, default=FPS,
+                        help="simulation steps per second of simulated time, independent of the frame rate")
+    parser.add_argument("--fast-forward", type=int, default=None, metavar="K",
+                        help="run K simulation steps per displayed frame, or with 0 as many as fit between frames "
+                             "(F4 toggles fast-forward)")
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="append every simulation step to this trajectory file")
+    parser.add_argument("--replay", default=None, metavar="FILE",
+                        help="play a recorded trajectory file back instead of simulating")
+    parser.add_argument("--load", default=None, metavar="FILE",
+                        help="start from this checkpoint instead of a new flock")
+    parser.add_argument("--checkpoint", default="world.boidsave", metavar="FILE",
+                        help="checkpoint F5 saves the world to and F9 loads it from, and autosaves go to")
+    parser.add_argument("--autosave-seconds", type=float, default=None, metavar="N",
+                        help="save the world to the checkpoint every N seconds in the background")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only the regions of the screen that changed every frame")
+    args = parser.parse_args()
+
+    scheduler.set_rates(1 / args.physics_rate, 1 / FPS)
+    scheduler.set_fast_forward(args.fast_forward)
+    if args.neighbors == VerletSearch.name:
+        simulation.set_neighbor_search(VerletSearch(skin=args.skin))
+    else:
+        simulation.set_neighbor_search(args.neighbors)
+    simulation.set_workers(args.workers)
+    simulation.set_obstacle_field(args.obstacle_field)
+    simulation.set_wrapped_clouds(args.wrapped_clouds)
+    simulation.set_staggered_steering(args.staggered)
+    if args.profile_output is not None:
+        timings.enabled = True
+        timings.start_export(args.profile_output)
+
+    replay = None
+    if args.replay is not None:
+        replay = TrajectoryReplay(args.replay)
+        if not len(replay):
+            parser.error(f"{args.replay} holds no whole frame to replay")
+        scheduler.set_rates(replay.dt, 1 / FPS)
+
+    recorder = None
+    if args.record is not None:
+        recorder = TrajectoryRecorder(args.record, scheduler.step_dt, boid_capacity=max(4 * objects.BOID_COUNT, 1024))
+
+    autosaver = None
+    if args.autosave_seconds is not None:
+        autosaver = checkpoint.Autosaver(args.checkpoint, args.autosave_seconds)
+
+    dirty_screen = DirtyScreen(BACKGROUND_COLOR) if args.dirty_rects else None
+
+    main(recorder, replay, args.load, args.checkpoint, autosaver, dirty_screen)
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pygame
+
+SPRITES_DIRECTORY = "sprites"
+
+
+class AssetManager:
+    """
+    Loads every sprite once and hands out the same surface to everyone who asks for it, scaled variants included.
+
+    Sprites are converted to the pixel format of the display, so blitting them doesn't convert every pixel again.
+    Sprites asked for before the display exists are converted by convert_loaded() once it does, and only
+    the ones asked for after that are converted for their users.
+    """
+
+    def __init__(self, directory: str = SPRITES_DIRECTORY):
+        self.directory = directory
+        self.images: dict[str, pygame.Surface] = {}
+        self.scaled: dict[tuple[str, tuple[int, int]], pygame.Surface] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    @staticmethod
+    def convert(image: pygame.Surface) -> pygame.Surface:
+        if pygame.display.get_surface() is None:
+            return image
+
+        return image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+
+    def get(self, name: str) -> pygame.Surface:
+        """The sprite in the sprites directory called name."""
+        try:
+            image = self.images[name]
+            self.hits += 1
+        except KeyError:
+            start = time.perf_counter()
+            image = self.images[name] = self.convert(pygame.image.load(os.path.join(self.directory, name)))
+            self.load_seconds += time.perf_counter() - start
+            self.misses += 1
+
+        return image
+
+    def get_scaled(self, name: str, size: tuple[float, float]) -> pygame.Surface:
+        """The sprite called name scaled to size, shared by every user of that size."""
+        key = (name, (int(size[0]), int(size[1])))
+        try:
+            image = self.scaled[key]
+            self.hits += 1
+        except KeyError:
+            image = self.scaled[key] = pygame.transform.scale(self.get(name), key[1])
+
+        return image
+
+    def convert_loaded(self):
+        """Converts what was loaded before the display was created, called once it is."""
+        start = time.perf_counter()
+        self.images = {name: self.convert(image) for name, image in self.images.items()}
+        self.scaled = {key: self.convert(image) for key, image in self.scaled.items()}
+        self.load_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.images) + len(self.scaled),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "load_ms": self.load_seconds * 1000,
+        }
+
+
+assets = AssetManager()
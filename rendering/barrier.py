@@ -0,0 +1,23 @@
+import pygame
+
+import surfaces
+from entities.barrier import Barrier
+from rendering.assets import assets
+from rendering.surface_cache import SurfaceCache
+
+
+def render_barrier(radius: float, color: tuple | None) -> pygame.Surface:
+    return pygame.transform.scale(assets.get("barrier.png"), (radius * 2, radius * 2))
+
+
+cache = SurfaceCache(render_barrier)
+
+
+def barrier_blit(barrier: Barrier, growing: bool = False) -> tuple[pygame.Surface, tuple[float, float]]:
+    image = cache.get(barrier.radius, transient=growing)
+    half_size = image.get_width() / 2
+    return image, (barrier.x - half_size, barrier.y - half_size)
+
+
+def draw_barrier(barrier: Barrier):
+    surfaces.main_screen.blit(*barrier_blit(barrier))
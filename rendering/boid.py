@@ -0,0 +1,198 @@
+import math
+
+import numpy as np
+import pygame
+
+import surfaces
+from calculations import angles
+from calculations.coloring import interpolate_color, replace_color
+from entities.boid import (Boid, Tracer, SIZE, SIGHT_DISTANCE, PERSONAL_SPACE, GRADIENT_COLORING, REPLACE_COLOR,
+                           TARGET_NEIGHBOUR_COUNT, TOGETHER_COLOR, ALONE_COLOR, SIGHT_ALPHA, SIGHT_COLOR,
+                           PERSONAL_SPACE_COLOR, TRACE_LENGTH, TRACER_COLOR)
+from rendering.assets import assets
+
+IMAGE = pygame.transform.flip(assets.get_scaled("arrow_white_center.png", (SIZE, SIZE)), True, False)
+
+# Resolution of the sprite atlas: headings around the circle, and colors from ALONE_COLOR to TOGETHER_COLOR
+HEADING_STEPS = 128
+TINT_STEPS = 16
+
+
+def orient(image: pygame.Surface, rad: float) -> pygame.Surface:
+    # Boids heading left are mirrored rather than turned upside down
+    if angles.get_quadrant(rad) in (1, 4):
+        return pygame.transform.rotate(image, math.degrees(rad))
+
+    return pygame.transform.flip(
+        pygame.transform.rotate(image, 180 - math.degrees(rad)), True, False)
+
+
+def build_atlas(heading_steps: int, tint_steps: int) -> list[list[tuple[pygame.Surface, float, float]]]:
+    """
+    Every tint of the boid sprite at every heading, with the offsets from its center to its top left corner.
+    Without GRADIENT_COLORING there is a single, untinted row.
+    """
+    if GRADIENT_COLORING:
+        tints = [replace_color(IMAGE, old_color=REPLACE_COLOR,
+                               new_color=interpolate_color(ALONE_COLOR, TOGETHER_COLOR, i / (tint_steps - 1)))
+                 for i in range(tint_steps)]
+    else:
+        tints = [IMAGE]
+
+    atlas = []
+    for tint in tints:
+        row = []
+        for heading in range(heading_steps):
+            image = orient(tint, 2 * math.pi * heading / heading_steps)
+            row.append((image, image.get_width() / 2, image.get_height() / 2))
+        atlas.append(row)
+
+    return atlas
+
+
+ATLAS = build_atlas(HEADING_STEPS, TINT_STEPS)
+
+# The atlas flattened to tint * HEADING_STEPS + heading, for looking up a whole flock at once
+ATLAS_IMAGES = np.empty(len(ATLAS) * HEADING_STEPS, dtype=object)
+ATLAS_IMAGES[:] = [image for row in ATLAS for image, _, _ in row]
+ATLAS_HALF_SIZES = np.array([(half_width, half_height) for row in ATLAS for _, half_width, half_height in row])
+
+
+def build_sight_stamps(tint_steps: int) -> list[pygame.Surface]:
+    """
+    The translucent sight circle in every tint of the atlas, or in SIGHT_COLOR without GRADIENT_COLORING.
+    Colors are premultiplied by SIGHT_ALPHA, so overlapping stamps can be added together and keep their hue.
+    """
+    if GRADIENT_COLORING:
+        colors = [interpolate_color(ALONE_COLOR, TOGETHER_COLOR, i / (tint_steps - 1)) for i in range(tint_steps)]
+    else:
+        colors = [SIGHT_COLOR]
+
+    stamps = []
+    for color in colors:
+        stamp = pygame.Surface((SIGHT_DISTANCE * 2, SIGHT_DISTANCE * 2), pygame.SRCALPHA)
+        premultiplied = tuple(round(c * SIGHT_ALPHA / 255) for c in color)
+        (pygame.draw.circle
+         (stamp, color=(*premultiplied, SIGHT_ALPHA), center=(SIGHT_DISTANCE, SIGHT_DISTANCE), radius=SIGHT_DISTANCE))
+        stamps.append(stamp)
+
+    return stamps
+
+
+SIGHT_STAMPS = build_sight_stamps(TINT_STEPS)
+
+# Screen sized layer every sight circle is composited onto before it is blitted to the screen once
+sight_overlay: pygame.Surface | None = None
+
+
+# Segment i of a trail, counted from its oldest point, is min(i // 2, 4) pixels wide.
+# (width, first segment, end segment) of the runs of equal width, each drawn as one polyline
+TRACER_WIDTH_BANDS = ((1, 2, 4), (2, 4, 6), (3, 6, 8), (4, 8, None))
+
+
+def draw_trail(points: list, color) -> list[pygame.Rect]:
+    rects = []
+    for width, first, end in TRACER_WIDTH_BANDS:
+        band = points[first:None if end is None else end + 1]
+        if len(band) > 1:
+            rects.append(pygame.draw.lines(surfaces.main_screen, color, False, band, width))
+    return rects
+
+
+def draw_tracer(tracer: Tracer):
+    draw_trail(tracer.points, tracer.color_main)
+
+
+def draw_tracers(flock) -> list[pygame.Rect]:
+    """Draws the trail of every boid in the flock, reading all rings in one gather. Returns the rectangles drawn to."""
+    n = len(flock)
+    storage = flock.storage
+    lengths = storage.trace_lengths[:n].tolist()
+
+    # From the next slot to write around the ring is oldest to newest, the valid points are the last lengths
+    order = (storage.trace_heads[:n, None] + np.arange(TRACE_LENGTH)) % TRACE_LENGTH
+    trails = storage.traces[np.arange(n)[:, None], order].tolist()
+
+    rects = []
+    for trail, length in zip(trails, lengths):
+        if length > 1:
+            rects.extend(draw_trail(trail[TRACE_LENGTH - length:], TRACER_COLOR))
+    return rects
+
+
+def get_tint(boid: Boid) -> int:
+    if not GRADIENT_COLORING:
+        return 0
+
+    neighbor_percentage = min((boid.neighbors_count / TARGET_NEIGHBOUR_COUNT), 1)
+    return round(neighbor_percentage * (TINT_STEPS - 1))
+
+
+def get_tints(flock) -> np.ndarray:
+    if not GRADIENT_COLORING:
+        return np.zeros(len(flock), dtype=np.int64)
+
+    neighbor_percentage = np.minimum(flock.neighbors_count / TARGET_NEIGHBOUR_COUNT, 1)
+    return np.rint(neighbor_percentage * (TINT_STEPS - 1)).astype(np.int64)
+
+
+def get_atlas_entry(boid: Boid) -> tuple[pygame.Surface, float, float]:
+    heading = round(boid.get_radians() / (2 * math.pi) * HEADING_STEPS) % HEADING_STEPS
+    return ATLAS[get_tint(boid)][heading]
+
+
+def boid_blits(flock, positions: np.ndarray | None = None) -> list[tuple[pygame.Surface, list[float]]]:
+    """
+    (sprite, top left) of every boid in the flock, for one Surface.blits call.
+
+    Args:
+        positions: Where to draw the boids if not at their current positions.
+    """
+    if positions is None:
+        positions = flock.positions
+
+    directions = flock.directions
+    radians = np.arctan2(directions[:, 1], directions[:, 0]) % (2 * math.pi)
+    entries = np.rint(radians / (2 * math.pi) * HEADING_STEPS).astype(np.int64) % HEADING_STEPS
+    entries += get_tints(flock) * HEADING_STEPS
+
+    corners = positions - ATLAS_HALF_SIZES[entries]
+    return list(zip(ATLAS_IMAGES[entries], corners.tolist()))
+
+
+def draw_boid(boid: Boid):
+    image, half_width, half_height = get_atlas_entry(boid)
+    surfaces.main_screen.blit(image, (boid.x - half_width, boid.y - half_height))
+
+
+def draw_sight(boid: Boid):
+    surfaces.main_screen.blit(SIGHT_STAMPS[get_tint(boid)], (boid.x - SIGHT_DISTANCE, boid.y - SIGHT_DISTANCE),
+                              special_flags=pygame.BLEND_PREMULTIPLIED)
+
+
+def draw_sights(flock, positions: np.ndarray | None = None) -> list[pygame.Rect]:
+    """
+    Composites the sight circle of every boid onto the shared overlay, then blits the overlay once.
+    Returns the rectangles of the circles, the rest of the overlay is transparent.
+    """
+    global sight_overlay
+
+    if positions is None:
+        positions = flock.positions
+
+    if sight_overlay is None:
+        sight_overlay = pygame.Surface(surfaces.main_screen.get_size(), pygame.SRCALPHA)
+
+    stamps = np.empty(len(SIGHT_STAMPS), dtype=object)
+    stamps[:] = SIGHT_STAMPS
+    corners = positions - SIGHT_DISTANCE
+
+    sight_overlay.fill((0, 0, 0, 0))
+    rects = sight_overlay.blits([(stamp, corner, None, pygame.BLEND_RGBA_ADD)
+                                 for stamp, corner in zip(stamps[get_tints(flock)], corners.tolist())])
+    surfaces.main_screen.blit(sight_overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+    return rects
+
+
+def draw_personal_space(boid: Boid):
+    pygame.draw.circle(surfaces.main_screen, PERSONAL_SPACE_COLOR, boid.get_coordinates(), PERSONAL_SPACE)
@@ -0,0 +1,47 @@
+import pygame
+
+import surfaces
+from entities.cloud import Cloud
+from rendering.surface_cache import SurfaceCache
+from surfaces import main_screen_width, main_screen_height
+
+
+def render_cloud(radius: float, color: tuple) -> pygame.Surface:
+    circle_surface = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+
+    pygame.draw.circle(circle_surface, color, (radius, radius), radius)
+    pygame.draw.circle(circle_surface, tuple((v-20) for v in color), (radius, radius),
+                       radius, Cloud.BORDER_THICKNESS)
+    return circle_surface
+
+
+cache = SurfaceCache(render_cloud)
+
+
+def cloud_blits(cloud: Cloud, growing: bool = False) -> list[tuple[pygame.Surface, tuple[float, float]]]:
+    """(surface, top left) of the cloud, plus the copies wrapped around the screen edges it overlaps."""
+
+    if cloud.radius == 0:
+        return []
+
+    circle_surface = cache.get(cloud.radius, cloud.color, transient=growing)
+    half_size = circle_surface.get_width() / 2
+    blits = [(circle_surface, (cloud.x - half_size, cloud.y - half_size))]
+
+    if cloud.x + cloud.radius >= main_screen_width:
+        blits.append((circle_surface, (cloud.x - half_size - main_screen_width, cloud.y - half_size)))
+
+    if cloud.x - cloud.radius <= 0:
+        blits.append((circle_surface, (cloud.x - half_size + main_screen_width, cloud.y - half_size)))
+
+    if cloud.y + cloud.radius >= main_screen_height:
+        blits.append((circle_surface, (cloud.x - half_size, cloud.y - half_size - main_screen_height)))
+
+    if cloud.y - cloud.radius <= 0:
+        blits.append((circle_surface, (cloud.x - half_size, cloud.y - half_size + main_screen_height)))
+
+    return blits
+
+
+def draw_cloud(cloud: Cloud):
+    surfaces.main_screen.blits(cloud_blits(cloud), doreturn=False)
@@ -0,0 +1,81 @@
+from typing import Callable
+
+import pygame
+
+import surfaces
+
+# Past this many rectangles a frame updates their bounding box instead, one large copy beats hundreds of small ones
+MAX_RECTS = 256
+
+
+def merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+    if len(rects) <= MAX_RECTS:
+        return rects
+
+    return [rects[0].unionall(rects[1:])]
+
+
+class DirtyScreen:
+    """
+    Redraws only the regions of the screen that changed since the last frame. Every draw method returns
+    the rectangles to pass to pygame.display.update() instead of flipping the whole screen.
+
+    draw() erases what the last frame drew, draws the scene again and reports both, so everything nothing
+    is drawn to keeps the background. redraw() repaints a few regions of a scene that did not move, such as
+    widgets whose look changed while the simulation is paused.
+    """
+
+    def __init__(self, background: tuple[int, int, int]):
+        self.background = background
+        self.drawn: list[pygame.Rect] = []
+        self.full_redraw = True
+        self.widget_states: dict[object, tuple] = {}
+
+    def invalidate(self):
+        """The next draw() repaints the whole screen."""
+        self.full_redraw = True
+
+    def changed_widgets(self, widgets: list) -> list[pygame.Rect]:
+        """The area of every widget whose get_draw_state() differs from the one of the last call."""
+        changed = []
+        for widget in widgets:
+            state = widget.get_draw_state()
+            if self.widget_states.get(widget) != state:
+                self.widget_states[widget] = state
+                changed.append(widget.area)
+
+        return changed
+
+    def draw(self, draw_scene: Callable[[], list[pygame.Rect]]) -> list[pygame.Rect]:
+        """Draws a scene that draw_scene() draws and returns the rectangles drawn to."""
+        screen = surfaces.main_screen
+
+        if self.full_redraw:
+            self.full_redraw = False
+            screen.fill(self.background)
+            self.drawn = merge_rects(draw_scene())
+            return [screen.get_rect()]
+
+        erased = self.drawn
+        for rect in erased:
+            screen.fill(self.background, rect)
+
+        self.drawn = merge_rects(draw_scene())
+        return erased + self.drawn
+
+    def redraw(self, regions: list[pygame.Rect], draw_scene: Callable[[], list[pygame.Rect]]) -> list[pygame.Rect]:
+        """
+        Repaints the scene within the bounding box of regions, with a single draw_scene() however many there are.
+        What the scene draws must not have moved since the last draw(), so the rest of the box comes out as it was.
+        """
+        if not regions:
+            return []
+
+        screen = surfaces.main_screen
+        area = regions[0].unionall(regions[1:])
+        screen.set_clip(area)
+        screen.fill(self.background)
+        draw_scene()
+        screen.set_clip(None)
+
+        return [area]
@@ -0,0 +1,57 @@
+import pygame
+
+import surfaces
+from instrumentation import FrameTimings
+
+TEXT_COLOR = (230, 230, 230)
+BACKGROUND_COLOR = (0, 0, 0, 170)
+LINE_HEIGHT = 16
+MARGIN = 8
+
+# Cache counters the overlay shows and their labels, each only when the cache keeps it
+CACHE_COUNTERS = (("size", "kept"), ("candidate_pairs", "candidate pairs"), ("misses", "misses"),
+                  ("evictions", "evicted"))
+
+font = None
+
+
+def draw_overlay(timings: FrameTimings,
+                 counts: dict[str, int],
+                 cache_stats: dict[str, dict] | None = None) -> pygame.Rect:
+    """
+    Draws the mean time of every phase, frame time percentiles, entity counts and render cache statistics
+    in the top right corner, and returns the rectangle drawn to.
+    """
+    global font
+
+    if font is None:
+        font = pygame.font.SysFont("monospace", 13)
+
+    lines = [f"{phase:<11}{ms:7.2f} ms" for phase, ms in timings.phase_means().items()]
+    lines.append("")
+    lines.extend(f"frame p{p:<7g}{ms:7.2f} ms" for p, ms in timings.frame_time_percentiles().items())
+    lines.append("")
+    lines.extend(f"{name:<11}{count:7d}" for name, count in counts.items())
+    for name, stats in (cache_stats or {}).items():
+        lines.append("")
+        lines.append(f"{name} {stats['hit_rate']:.0%} hits")
+        counters = [f"{stats[key]} {label}" for key, label in CACHE_COUNTERS if key in stats]
+        if counters:
+            lines.append(f"  {', '.join(counters)}")
+        if "load_ms" in stats:
+            lines.append(f"  loaded in {stats['load_ms']:.1f} ms")
+        if "steps_per_rebuild" in stats:
+            lines.append(f"  rebuilt every {stats['steps_per_rebuild']:.1f} steps")
+
+    rendered = [font.render(line, True, TEXT_COLOR) for line in lines]
+    width = max(text.get_width() for text in rendered) + 2 * MARGIN
+    height = len(rendered) * LINE_HEIGHT + 2 * MARGIN
+
+    background = pygame.Surface((width, height), pygame.SRCALPHA)
+    background.fill(BACKGROUND_COLOR)
+
+    left = surfaces.main_screen_width - width - MARGIN
+    rect = surfaces.main_screen.blit(background, (left, MARGIN))
+    surfaces.main_screen.blits([(text, (left + MARGIN, 2 * MARGIN + i * LINE_HEIGHT))
+                                for i, text in enumerate(rendered)], doreturn=False)
+    return rect
@@ -0,0 +1,54 @@
+import pygame
+
+import surfaces
+from entities.balloon import Balloon
+from entities.barrier import Barrier
+from entities.cloud import Cloud
+from instrumentation import timings
+from rendering.barrier import barrier_blit
+from rendering.boid import boid_blits, draw_sights, draw_tracers
+from rendering.cloud import cloud_blits
+
+
+def draw_world(boids,
+               barriers: list[Barrier],
+               clouds: list[Cloud],
+               show_boids: bool = True,
+               show_barriers: bool = True,
+               show_clouds: bool = True,
+               show_sight: bool = False,
+               growing_balloon: Balloon | None = None,
+               alpha: float = 1.0) -> list[pygame.Rect]:
+    """
+    Draws every entity onto the main screen, sight circles first and clouds on top, and returns the rectangles
+    drawn to. Each layer is gathered into (surface, position) pairs and submitted with a single Surface.blits call.
+
+    Args:
+        growing_balloon: The balloon being placed, if any. Its sizes are only cached until it stops growing.
+        alpha: How far real time is between the last two simulation steps, boids are drawn that far along.
+    """
+    main_screen = surfaces.main_screen
+    positions = boids.interpolated_positions(alpha)
+    rects = []
+
+    if show_sight:
+        rects.extend(draw_sights(boids, positions))
+    timings.mark("sight")
+
+    if show_barriers:
+        rects.extend(main_screen.blits([barrier_blit(bar, bar is growing_balloon) for bar in barriers]))
+    timings.mark("barriers")
+
+    if show_boids:
+        if boids.tracing:
+            rects.extend(draw_tracers(boids))
+        rects.extend(main_screen.blits(boid_blits(boids, positions)))
+    timings.mark("boids")
+
+    if show_clouds:
+        rects.extend(main_screen.blits([blit
+                                        for cloud in clouds
+                                        for blit in cloud_blits(cloud, cloud is growing_balloon)]))
+    timings.mark("cloud_draw")
+
+    return rects
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class SurfaceCache:
+    """
+    Bounded LRU of surfaces rendered by render(radius, color), keyed on radius rounded to `quantum` pixels.
+
+    Surfaces of a balloon that is still growing are marked transient and dropped by finish_growing(),
+    so the sizes it passed through don't push the settled ones out.
+    """
+
+    def __init__(self, render, capacity: int = 256, quantum: float = 0.5):
+        self.render = render
+        self.capacity = capacity
+        self.quantum = quantum
+
+        self.entries: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+        self.transient_keys: set[tuple] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, radius: float) -> float:
+        return round(radius / self.quantum) * self.quantum
+
+    def get(self, radius: float, color: tuple | None = None, transient: bool = False) -> pygame.Surface:
+        radius = self.quantize(radius)
+        key = (radius, color)
+
+        try:
+            surface = self.entries[key]
+            self.entries.move_to_end(key)
+            self.hits += 1
+        except KeyError:
+            surface = self.entries[key] = self.render(radius, color)
+            self.misses += 1
+            if transient:
+                self.transient_keys.add(key)
+
+            if len(self.entries) > self.capacity:
+                evicted, _ = self.entries.popitem(last=False)
+                self.transient_keys.discard(evicted)
+                self.evictions += 1
+
+        return surface
+
+    def finish_growing(self):
+        for key in self.transient_keys:
+            self.entries.pop(key, None)
+        self.transient_keys.clear()
+
+    def clear(self):
+        self.entries.clear()
+        self.transient_keys.clear()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
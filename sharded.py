@@ -0,0 +1,105 @@
+import argparse
+import math
+import socket
+import time
+
+import numpy as np
+
+from entities.boid import MAX_SPEED
+from game_state import simulation
+from game_state.shards import Coordinator, launch_local_shards, serve_shard
+from surfaces import main_screen_width, main_screen_height
+
+FPS = 30
+
+
+def parse_address(text: str) -> tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def random_world(boids: int, seed: int | None) -> tuple[np.ndarray, np.ndarray]:
+    """Boids spread over the whole screen at full speed in random headings, like objects.add_boids."""
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform((0, 0), (main_screen_width, main_screen_height), size=(boids, 2))
+    radians = rng.uniform(0, 2 * math.pi, size=boids)
+    directions = np.stack((np.cos(radians), np.sin(radians)), axis=1) * MAX_SPEED
+    return positions, directions
+
+
+def coordinate(coordinator: Coordinator, args):
+    coordinator.init(*random_world(args.boids, args.seed))
+
+    if args.render:
+        import pygame
+        import surfaces
+
+        pygame.init()
+        pygame.display.set_caption("Boids! (sharded)")
+        main_screen = surfaces.init_display()
+        from rendering.boid import boid_blits
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        coordinator.step(args.dt,
+                         alignment_factor=simulation.ALIGNMENT_FACTOR,
+                         separation_factor=simulation.SEPARATION_FACTOR,
+                         cohesion_factor=simulation.COHESION_FACTOR)
+
+        if args.render:
+            pygame.event.pump()
+            main_screen.fill((30, 30, 30))
+            main_screen.blits(boid_blits(coordinator.snapshot()), doreturn=False)
+            pygame.display.flip()
+
+    steps_per_second = args.steps / (time.perf_counter() - start)
+    print(f"{args.steps} steps with {sum(coordinator.boid_counts)} boids on {len(coordinator.shards)} shards "
+          f"{coordinator.boid_counts}: {steps_per_second:.1f} steps per second")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the world split into horizontal strips, one process each.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    local = commands.add_parser("local", help="start the shards on this machine and coordinate them")
+    local.add_argument("--shards", type=int, default=4, help="number of strips")
+
+    shard = commands.add_parser("shard", help="serve one strip, started before the coordinator")
+    shard.add_argument("--index", type=int, required=True, help="strip number, 0 is the top one")
+    shard.add_argument("--count", type=int, required=True, help="number of strips")
+    shard.add_argument("--listen", type=parse_address, required=True, help="host:port to accept connections on")
+    shard.add_argument("--next", type=parse_address, default=None, help="host:port of the strip below, if any")
+
+    remote = commands.add_parser("coordinate", help="coordinate shards that are already running")
+    remote.add_argument("--shards", type=lambda text: [parse_address(a) for a in text.split(",")], required=True,
+                        help="comma separated host:port of every shard, top strip first")
+
+    for command in (local, remote):
+        command.add_argument("--steps", type=int, default=1000, help="number of simulation steps to run")
+        command.add_argument("--boids", type=int, default=2000, help="number of boids to spawn")
+        command.add_argument("--dt", type=float, default=1 / FPS, help="seconds simulated per step")
+        command.add_argument("--seed", type=int, default=None, help="seed for the random starting positions")
+        command.add_argument("--render", action="store_true", help="draw a snapshot of the world after every step")
+
+    args = parser.parse_args()
+
+    if args.command == "shard":
+        serve_shard(socket.create_server(args.listen), args.index, args.count, args.next)
+        return
+
+    if args.command == "local":
+        addresses, processes = launch_local_shards(args.shards)
+    else:
+        addresses, processes = args.shards, []
+
+    coordinator = Coordinator(addresses)
+    try:
+        coordinate(coordinator, args)
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,18 @@
-import pygame
-
 main_screen_width = 1280
 main_screen_height = 720
-main_screen = pygame.display.set_mode((main_screen_width, main_screen_height))
+
+# Created by init_display(), so the simulation can import the screen size without opening a window
+main_screen = None
+
+
+def init_display():
+    global main_screen
+
+    import pygame
+
+    main_screen = pygame.display.set_mode((main_screen_width, main_screen_height))
+
+    # Sprites loaded before the display existed can only now be converted to its pixel format
+    from rendering.assets import assets
+    assets.convert_loaded()
+    return main_screen
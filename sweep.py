@@ -0,0 +1,208 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import entities.boid
+
+FPS = 30
+
+# Swept parameters: separation, alignment and cohesion factors of the sliders, and the module constants
+# a run needs set before the simulation is imported
+PARAMETERS = {
+    "separation": float,
+    "alignment": float,
+    "cohesion": float,
+    "boids": int,
+    "sight_distance": float,
+    "personal_space": float,
+}
+
+
+def parse_values(text: str) -> list | tuple:
+    """"a,b,c" is a list of values to take, "low:high" a range to sample from."""
+    if ":" in text:
+        low, high = text.split(":")
+        return float(low), float(high)
+    return [float(value) for value in text.split(",")]
+
+
+def get_configurations(values: dict[str, list | tuple], samples: int | None, seed: int | None) -> list[dict]:
+    """
+    Every combination of the listed values, or with samples that many configurations, each parameter
+    drawn from its list or range. The same seed draws the same configurations, so a sweep can be resumed.
+    """
+    def convert(name: str, value: float):
+        return round(value) if PARAMETERS[name] is int else float(value)
+
+    if samples is None:
+        ranges = [name for name, choices in values.items() if isinstance(choices, tuple)]
+        if ranges:
+            raise ValueError(f"{', '.join(ranges)} given as a range, only --samples can draw from ranges")
+        return [{name: convert(name, value) for name, value in zip(values, combination)}
+                for combination in itertools.product(*values.values())]
+
+    rng = random.Random(seed)
+    return [{name: convert(name, rng.uniform(*choices) if isinstance(choices, tuple) else rng.choice(choices))
+             for name, choices in values.items()}
+            for _ in range(samples)]
+
+
+def get_key(configuration: dict, steps: int, dt: float, seed: int | None) -> str:
+    return json.dumps({**configuration, "steps": steps, "dt": dt, "seed": seed}, sort_keys=True)
+
+
+def read_finished(path: str) -> set[str]:
+    """The keys of the runs already in a results file. A line cut off by an interrupted sweep is ignored."""
+    if not os.path.exists(path):
+        return set()
+
+    finished = set()
+    with open(path) as file:
+        for line in file:
+            try:
+                finished.add(json.loads(line)["key"])
+            except (json.JSONDecodeError, KeyError):
+                pass
+    return finished
+
+
+def end_last_line(path: str):
+    """Ends a line cut off by an interrupted sweep, so the first new run starts a line of its own."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+
+    with open(path, "rb+") as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b"\n":
+            file.write(b"\n")
+
+
+def run_configuration(task: tuple[str, dict, int, float, int | None]) -> dict:
+    """
+    Runs in a fresh worker process: sets the perception constants, imports the simulation, which copies them,
+    runs the steps and returns the summary metrics averaged over the last quarter of them.
+
+    The grid search keeps a chunk size of one sight distance rather than timing its own, so the pairs are
+    summed in the same order on every machine and the same run always gives the same metrics.
+    """
+    key, configuration, steps, dt, seed = task
+    if "game_state.simulation" in sys.modules:
+        raise RuntimeError("Runs need a fresh process, the simulation has copied the constants of another run")
+
+    entities.boid.SIGHT_DISTANCE = configuration["sight_distance"]
+    entities.boid.PERSONAL_SPACE = configuration["personal_space"]
+
+    import numpy as np
+
+    from game_state import chunks, objects, simulation
+    from game_state.neighbors import GridSearch
+
+    chunks.set_chunk_size(configuration["sight_distance"])
+    simulation.set_neighbor_search(GridSearch(autotune_steps=None))
+    random.seed(seed)
+    objects.init(configuration["boids"])
+    boids = objects.boids
+
+    measured_steps = max(steps // 4, 1)
+    totals = {"polarization": 0.0, "mean_neighbors": 0.0, "alone": 0.0, "nearest_distance": 0.0,
+              "personal_space_intrusions": 0.0}
+
+    start = time.perf_counter()
+    for step in range(steps):
+        simulation.step(dt,
+                        separation_factor=configuration["separation"],
+                        alignment_factor=configuration["alignment"],
+                        cohesion_factor=configuration["cohesion"])
+        if step < steps - measured_steps or not len(boids):
+            continue
+
+        n = len(boids)
+        headings = boids.directions / np.hypot(boids.directions[:, 0], boids.directions[:, 1])[:, None]
+        i, _, distances = chunks.neighbor_pairs(boids.positions, entities.boid.SIGHT_DISTANCE)
+        # Boids that see nobody count as the sight distance away from their nearest neighbor
+        nearest = np.full(n, entities.boid.SIGHT_DISTANCE)
+        np.minimum.at(nearest, i, distances)
+
+        totals["polarization"] += np.hypot(*headings.mean(axis=0))
+        totals["mean_neighbors"] += boids.neighbors_count.mean()
+        totals["alone"] += np.count_nonzero(boids.neighbors_count == 0) / n
+        totals["nearest_distance"] += nearest.mean()
+        totals["personal_space_intrusions"] += np.count_nonzero(distances < entities.boid.PERSONAL_SPACE) / n
+
+    seconds = time.perf_counter() - start
+    return {
+        "key": key,
+        "configuration": configuration,
+        "steps": steps,
+        "dt": dt,
+        "seed": seed,
+        "metrics": {name: float(total) / measured_steps for name, total in totals.items()},
+        "steps_per_second": steps / seconds,
+    }
+
+
+def main():
+    from game_state import objects, simulation
+
+    parser = argparse.ArgumentParser(
+        description="Runs the simulation headless for every configuration of a parameter sweep on a process pool "
+                    "and appends a line of summary metrics per run to a results file.")
+    defaults = {
+        "separation": simulation.SEPARATION_FACTOR,
+        "alignment": simulation.ALIGNMENT_FACTOR,
+        "cohesion": simulation.COHESION_FACTOR,
+        "boids": objects.BOID_COUNT,
+        "sight_distance": entities.boid.SIGHT_DISTANCE,
+        "personal_space": entities.boid.PERSONAL_SPACE,
+    }
+    for name, default in defaults.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=parse_values, default=[default], metavar="VALUES",
+                            help=f"comma separated values, or low:high to draw from with --samples (default {default})")
+    parser.add_argument("--samples", type=int, default=None, metavar="N",
+                        help="run N configurations drawn at random instead of every combination")
+    parser.add_argument("--steps", type=int, default=1000, help="number of simulation steps of every run")
+    parser.add_argument("--dt", type=float, default=1 / FPS, help="seconds simulated per step")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the starting world and the drawn configurations")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of runs at once")
+    parser.add_argument("--output", default="sweep_results.jsonl", metavar="FILE",
+                        help="results file, runs already in it are skipped")
+    args = parser.parse_args()
+
+    values = {name: getattr(args, name) for name in PARAMETERS}
+    try:
+        configurations = get_configurations(values, args.samples, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tasks = {}
+    for configuration in configurations:
+        key = get_key(configuration, args.steps, args.dt, args.seed)
+        tasks[key] = (key, configuration, args.steps, args.dt, args.seed)
+    finished = read_finished(args.output)
+    end_last_line(args.output)
+    pending = [task for key, task in tasks.items() if key not in finished]
+    print(f"{len(tasks)} configurations, {len(tasks) - len(pending)} already in {args.output}")
+
+    start = time.perf_counter()
+    # Every run gets a fresh process, the constants it sets are copied by the modules when they are imported
+    with (multiprocessing.get_context("spawn").Pool(args.workers, maxtasksperchild=1) as pool,
+          open(args.output, "a") as output):
+        for done, result in enumerate(pool.imap_unordered(run_configuration, pending), start=1):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+            elapsed = time.perf_counter() - start
+            remaining = elapsed / done * (len(pending) - done)
+            print(f"\r{done}/{len(pending)} runs, {math.ceil(remaining)} s left", end="", flush=True)
+
+    print(f"\n{len(pending)} runs in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+from game_state import scheduler as scheduler_module
+from game_state.scheduler import FixedStepScheduler
+
+
+def test_high_physics_rate_keeps_up_with_real_time(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(scheduler_module.time, "perf_counter", lambda: now)
+
+    scheduler = FixedStepScheduler(step_dt=1 / 300, render_interval=1 / 30)
+    simulated = 0.0
+
+    def step(dt: float):
+        nonlocal simulated
+        simulated += dt
+
+    scheduler.run_frame(step)
+    steps = 0
+    for _ in range(300):
+        now += 1 / 30
+        steps += scheduler.run_frame(step)
+
+    # 10 seconds of frames at 30 per second, with less than a step left over in the accumulator
+    assert abs(steps / now - 300) < 1
+    assert now - simulated <= 1 / 300 + 1e-9
+
+
+def test_set_rates_derives_the_cap_from_the_rate():
+    scheduler = FixedStepScheduler(step_dt=1 / 30)
+    assert scheduler.max_steps_per_frame == 5
+
+    scheduler.set_rates(1 / 300, 1 / 30)
+    assert scheduler.max_steps_per_frame * (1 / 300) > 1 / 30
+
+    fixed = FixedStepScheduler(step_dt=1 / 300, max_steps_per_frame=3)
+    fixed.set_rates(1 / 600, 1 / 30)
+    assert fixed.max_steps_per_frame == 3